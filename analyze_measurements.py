@@ -0,0 +1,369 @@
+'''
+
+Analyzes the measurements of the portfolio offline, from the raw output of every flow.
+
+The ingest step reads every output file in the given directories, such as the test-case-* directories of
+measurements or the output directory of run_measurements.py, one line at a time. It understands the tables and the
+JSON records of simpleperf, the output of ping and the Server Report of iperf, and appends the values to a
+columnar store: a directory with one binary file per column, written in chunks, and files.json with the test and
+the flow of every file. The summary step reads the columns back in chunks, one file at a time, and prints the
+round-trip times of every ping, the transactions and round-trip times of every '--rr' and '--probe' flow, the
+throughput of every flow and Jain's fairness index of the flows that ran at the same time in the test matrix. Neither step holds more than a chunk of values and the values of a single file in memory,
+so the store can hold thousands of files.
+
+    python3 analyze_measurements.py -i measurements -s store
+    python3 analyze_measurements.py -s store
+
+'''
+
+import argparse
+import bisect
+import json
+import math
+import os
+import re
+import sys
+from array import array
+
+# The simpleperf module is imported from the directory next to this one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "simpleperf"))
+
+import simpleperf
+
+# A round-trip time in the output of ping
+PING_LINE = re.compile(r"icmp_seq=(\d+) .*time=([\d.]+) ms")
+
+# A row of a simpleperf table, with the ID, the interval in seconds, the transfer and the bandwidth
+SIMPLEPERF_ROW = re.compile(r"^\s*(\S+)\s+([\d.]+) - ([\d.]+)\s+([\d.]+) (B|KB|MB)\s+([\d.]+) Mbps")
+
+# The jitter and the loss columns of a UDP row of a simpleperf table
+SIMPLEPERF_UDP = re.compile(r"([\d.]+) ms\s+(\d+)/(\d+) \(")
+
+# A report of an iperf UDP server, with the interval in seconds, the transfer, the bandwidth, the jitter and the loss
+IPERF_REPORT = re.compile(r"^\[\s*(\d+)\]\s+([\d.]+)-\s*([\d.]+) sec\s+([\d.]+) (\w?)Bytes\s+([\d.]+) (\w?)bits/sec\s+([\d.]+) ms\s+(\d+)/\s*(\d+)")
+
+# The units of the transfer of simpleperf in bytes
+SIMPLEPERF_UNITS = {"B": 1, "KB": 1000, "MB": 1000000}
+
+# The units of the transfer of iperf in bytes, and of the bandwidth of iperf in bits per second
+IPERF_BYTES = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+IPERF_BITS = {"": 1, "K": 1e3, "M": 1e6, "G": 1e9}
+
+# The percentiles of the round-trip times in the summary, which are also the percentiles that simpleperf reports for '--rr' and '--probe'
+RTT_PERCENTILES = [50, 90, 99]
+
+# The columns of the round-trip times, in milliseconds, of the '--rr' and '--probe' results of simpleperf, and of the results of every connection of a flow
+RTT_COLUMNS = [("file", "I"), ("seq", "I"), ("ms", "d")]
+LATENCY_COLUMNS = [("file", "I"), ("start", "d"), ("end", "d"), ("transactions", "d"), ("tps", "d")] + [(f"p{value}", "d") for value in RTT_PERCENTILES]
+THROUGHPUT_COLUMNS = [("file", "I"), ("start", "d"), ("end", "d"), ("bytes", "d"), ("bps", "d"), ("jitter", "d"), ("lost", "d"), ("total", "d")]
+
+# The amount of rows of every column that is kept in memory before it is written to the store, or read from it
+CHUNK_ROWS = 65536
+
+
+# This function will parse the command-line arguments
+def parse_args():
+    # Defines and parses the command-line argument
+    parser = argparse.ArgumentParser(description = 'Analyzes the measurements of the portfolio')
+
+    # '-i' flag: Sets the directories or files that are ingested into the store, which replaces the store
+    parser.add_argument('-i', '--ingest', type = str, nargs = '+', help = "Directories or files to ingest")
+
+    # '-s' flag: Sets the directory of the store
+    parser.add_argument('-s', '--store', type = str, default = "store", help = "Directory of the columnar store")
+
+    # '-m' flag: Sets the path of the test matrix, which tells which flows ran at the same time
+    parser.add_argument('-m', '--matrix', type = str, default = os.path.join("measurements", "matrix.json"), help = "Path of the JSON test matrix")
+
+    # Returns the parsed command-line arguments
+    return parser.parse_args()
+
+# The columns of a table in the store, where every column is a file of raw values of a single type
+class Table:
+    def __init__(self, store, name, columns):
+        # The path of the file of every column
+        self.paths = [os.path.join(store, f"{name}.{column}") for column, typecode in columns]
+
+        # The values of every column that are not written yet
+        self.columns = [array(typecode) for column, typecode in columns]
+
+    # This function adds a row to the table, and writes a chunk of every column when it is full
+    def append(self, row):
+        for column, value in zip(self.columns, row):
+            column.append(value)
+        if len(self.columns[0]) >= CHUNK_ROWS:
+            self.flush()
+
+    # This function appends the values that are not written yet to the file of every column
+    def flush(self):
+        for path, column in zip(self.paths, self.columns):
+            with open(path, "ab") as column_file:
+                column.tofile(column_file)
+            del column[:]
+
+    # This function removes the files of every column
+    def clear(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    # This function reads the table in chunks, and yields the values of every column in the chunk
+    def read_chunks(self):
+        column_files = [open(path, "rb") for path in self.paths]
+        try:
+            while True:
+                chunk = [array(column.typecode) for column in self.columns]
+                for column_file, column in zip(column_files, chunk):
+                    # The last chunk is shorter, which fromfile() tells with an error after it has read the values
+                    try:
+                        column.fromfile(column_file, CHUNK_ROWS)
+                    except EOFError:
+                        pass
+                if not chunk[0]:
+                    return
+                yield chunk
+        finally:
+            for column_file in column_files:
+                column_file.close()
+
+    # This function yields the ID of every file in the table, with the values of every other column of its rows
+    # The rows of a file are next to each other, since every file is ingested at once, so a file is only split across two chunks
+    def read_files(self):
+        pending = None
+        for chunk in self.read_chunks():
+            file_ids = chunk[0]
+            start = 0
+            while start < len(file_ids):
+                # The rows of the file run until the next file, and the IDs only grow, so the end is found with a binary search
+                file_id = file_ids[start]
+                end = bisect.bisect_right(file_ids, file_id, start)
+                values = [column[start:end] for column in chunk[1:]]
+
+                # The rest of a file that started in the last chunk
+                if pending is not None and pending[0] == file_id:
+                    for column, rest in zip(pending[1], values):
+                        column.extend(rest)
+                else:
+                    if pending is not None:
+                        yield pending
+                    pending = (file_id, values)
+                start = end
+        if pending is not None:
+            yield pending
+
+# This function parses an output file one line at a time, and yields ("rtt", row), ("latency", row) and ("throughput", row) for every value
+def parse_file(path):
+    # The last result of every connection, since a table or a log has interval results before the result of the whole transfer
+    results = {}
+
+    with open(path, errors = "replace") as output_file:
+        for line in output_file:
+            # A round-trip time of ping
+            match = PING_LINE.search(line)
+            if match:
+                yield "rtt", (int(match.group(1)), float(match.group(2)))
+                continue
+
+            # A JSON record of simpleperf, where only the result of every stream is kept
+            # The results of the '--rr' flag and of the probe of the '--probe' flag hold transactions instead of bytes, and are latency rows of their own
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("event") == "stream" and "transactions" in record:
+                    yield "latency", (record["start"] / 1e9, record["end"] / 1e9, record["transactions"], record["transactions_per_second"]) + tuple(record[f"p{value}"] / 1e6 if record.get(f"p{value}") is not None else math.nan for value in RTT_PERCENTILES)
+                elif record.get("event") == "stream" and "bytes" in record:
+                    results[("json", len(results))] = (record["start"] / 1e9, record["end"] / 1e9, record["bytes"], record["bits_per_second"], record.get("jitter", math.nan), record.get("lost", math.nan), record.get("sent", math.nan))
+                continue
+
+            # A report of an iperf UDP server
+            match = IPERF_REPORT.search(line)
+            if match:
+                connection, start, end, transfer, byte_unit, bandwidth, bit_unit, jitter, lost, total = match.groups()
+                results[("iperf", connection)] = (float(start), float(end), float(transfer) * IPERF_BYTES[byte_unit], float(bandwidth) * IPERF_BITS[bit_unit], float(jitter), float(lost), float(total))
+                continue
+
+            # A row of a simpleperf table, where the sum of several connections is left out, since the flow is the sum of its connections
+            match = SIMPLEPERF_ROW.search(line)
+            if match and match.group(1) != "[SUM]":
+                connection, start, end, transfer, unit, bandwidth = match.groups()
+                udp = SIMPLEPERF_UDP.search(line, match.end())
+                jitter, lost, total = (float(udp.group(1)), float(udp.group(2)), float(udp.group(3))) if udp else (math.nan, math.nan, math.nan)
+                results[("table", connection)] = (float(start), float(end), float(transfer) * SIMPLEPERF_UNITS[unit], float(bandwidth) * 1e6, jitter, lost, total)
+
+    # The result of every connection of the flow
+    for result in results.values():
+        yield "throughput", result
+
+# This function finds every output file in the given directories, in a stable order
+def find_files(paths):
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for directory, directories, files in os.walk(path):
+            directories.sort()
+            for name in sorted(files):
+                if name.endswith((".txt", ".jsonl")):
+                    yield os.path.join(directory, name)
+
+# This function ingests every output file into a new store, and returns the amount of files and rows
+def ingest(paths, store):
+    # The store is replaced by the ingested files
+    os.makedirs(store, exist_ok = True)
+    tables = {"rtt": Table(store, "rtt", RTT_COLUMNS), "latency": Table(store, "latency", LATENCY_COLUMNS), "throughput": Table(store, "throughput", THROUGHPUT_COLUMNS)}
+    for table in tables.values():
+        table.clear()
+
+    # The test and the flow of every file, where the test is the directory of the file and the flow is its name
+    files = []
+    rows = 0
+    for path in find_files(paths):
+        file_id = len(files)
+        kinds = set()
+        for kind, row in parse_file(path):
+            tables[kind].append((file_id,) + row)
+            kinds.add(kind)
+            rows += 1
+
+        # Files without any value, such as the output of a simpleperf server, are left out
+        if kinds:
+            files.append({"path": path, "test": os.path.basename(os.path.dirname(os.path.abspath(path))), "flow": os.path.splitext(os.path.basename(path))[0], "kinds": sorted(kinds)})
+
+    # Writes the rest of every column and the files
+    for table in tables.values():
+        table.flush()
+    with open(os.path.join(store, "files.json"), "w") as files_file:
+        json.dump(files, files_file, indent = 2)
+
+    # Returns the amount of files and rows
+    return len(files), rows
+
+# This function returns the value at the given percentile of the sorted values, with the nearest-rank method
+def percentile(values, percentile):
+    return values[max(0, math.ceil(len(values) * percentile / 100) - 1)]
+
+# This function returns Jain's fairness index of the throughput of the flows, which is 1 when every flow gets the same share
+def jain_index(throughputs):
+    squares = math.fsum(value * value for value in throughputs)
+    return math.fsum(throughputs) ** 2 / (len(throughputs) * squares) if squares else 0.0
+
+# This function reads the test matrix, and returns the name and the files of every test where several throughput flows ran at the same time
+def concurrent_flows(path):
+    # Without a matrix, no flows are known to run at the same time
+    if not os.path.exists(path):
+        return []
+
+    # Reads the matrix
+    with open(path) as matrix_file:
+        matrix = json.load(matrix_file)
+
+    # The files of the throughput flows of every test, named as in run_measurements.load_matrix()
+    groups = []
+    for test in matrix["tests"]:
+        flows = [flow for flow in test["flows"] if flow.get("type", "throughput") == "throughput"]
+        if len(flows) > 1:
+            suffix = f"-{test['tag']}" if "tag" in test else ""
+            groups.append((test["name"] + suffix, [(test["name"], "throughput_" + flow.get("name", f"{flow['client']}-{flow['server']}") + suffix) for flow in flows]))
+    return groups
+
+# This function prints a row of the summary table, where the first column is as wide as the names of the flows
+def print_row(data):
+    # Prints out the data element in a single row
+    print(("{:<40}" + "{:>12}" * (len(data) - 1)).format(*data))
+
+# This function prints the round-trip times of every file, and of every file together
+def summarize_rtt(store, files):
+    # Printing the headers of the table
+    print_row(["RTT (ms)", "Samples", "Mean", "Min", "Max"] + [f"p{value}" for value in RTT_PERCENTILES])
+
+    # Every round-trip time in microseconds, in a histogram of a fixed size, with the count, sum, min and max of every file
+    histogram = simpleperf.Histogram()
+    count, total, minimum, maximum = 0, 0.0, math.inf, -math.inf
+
+    # The round-trip times of a single file are sorted, so the percentiles are exact
+    for file_id, (seqs, values) in Table(store, "rtt", RTT_COLUMNS).read_files():
+        values = sorted(values)
+        print_row([f"{files[file_id]['test']}/{files[file_id]['flow']}", len(values), f"{math.fsum(values) / len(values):.3f}", f"{values[0]:.3f}", f"{values[-1]:.3f}"] + [f"{percentile(values, value):.3f}" for value in RTT_PERCENTILES])
+
+        # Adds the file to the summary of every file
+        for value in values:
+            histogram.record(round(value * 1000))
+        count += len(values)
+        total += math.fsum(values)
+        minimum = min(minimum, values[0])
+        maximum = max(maximum, values[-1])
+
+    # The percentiles of every file together are the highest value of their bucket in the histogram
+    if count:
+        print_row(["All files", count, f"{total / count:.3f}", f"{minimum:.3f}", f"{maximum:.3f}"] + [f"{histogram.percentile(value) / 1000:.3f}" for value in RTT_PERCENTILES])
+
+# This function prints the transactions and the round-trip times of every '--rr' and '--probe' flow
+def summarize_latency(store, files):
+    # Printing the headers of the table
+    print_row(["Latency (ms)", "Streams", "Count", "tps"] + [f"p{value}" for value in RTT_PERCENTILES])
+
+    # The transactions of a flow are the sum of its streams, and the percentiles of a flow are those of its slowest stream, since simpleperf only reports the percentiles of every stream
+    for file_id, (starts, ends, transactions, rates, *percentiles) in Table(store, "latency", LATENCY_COLUMNS).read_files():
+        print_row([f"{files[file_id]['test']}/{files[file_id]['flow']}", len(rates), f"{math.fsum(transactions):.0f}", f"{math.fsum(rates):.1f}"] + [f"{max(values):.3f}" for values in percentiles])
+
+# This function prints the throughput of every flow, and returns the throughput of every flow by its test and name
+def summarize_throughput(store, files):
+    # Printing the headers of the table
+    print_row(["Throughput", "Streams", "Transfer", "Duration", "Mbps", "Jitter", "Loss"])
+
+    # The throughput of every flow in bits per second, by its test and name
+    throughputs = {}
+
+    # The flow is the sum of its connections, and lasts as long as its longest connection
+    for file_id, (starts, ends, transfers, rates, jitters, losts, totals) in Table(store, "throughput", THROUGHPUT_COLUMNS).read_files():
+        rate = math.fsum(rates)
+        throughputs[(files[file_id]["test"], files[file_id]["flow"])] = rate
+
+        # The jitter and the loss are only known for UDP flows
+        udp = not math.isnan(totals[0])
+        jitter = f"{max(jitters):.3f} ms" if udp else "-"
+        loss = f"{math.fsum(losts) / math.fsum(totals):.2%}" if udp and math.fsum(totals) else "-"
+        print_row([f"{files[file_id]['test']}/{files[file_id]['flow']}", len(rates), f"{math.fsum(transfers) / 1e6:.2f} MB", f"{max(ends) - min(starts):.1f} s", f"{rate / 1e6:.2f}", jitter, loss])
+
+    # Returns the throughput of every flow
+    return throughputs
+
+# This function prints Jain's fairness index of every test where several flows ran at the same time
+def summarize_fairness(throughputs, groups):
+    # Printing the headers of the table
+    print_row(["Fairness", "Flows", "Total Mbps", "Jain"])
+
+    # Only the flows that are in the store count, so a test with a single flow in the store is left out
+    for name, flows in groups:
+        rates = [throughputs[flow] for flow in flows if flow in throughputs]
+        if len(rates) > 1:
+            print_row([name, len(rates), f"{math.fsum(rates) / 1e6:.2f}", f"{jain_index(rates):.3f}"])
+
+# This is the main entry point of the analysis
+if __name__ == '__main__':
+    # Parses the command line arguments
+    args = parse_args()
+
+    # Ingests the output files into a new store
+    if args.ingest:
+        file_count, row_count = ingest(args.ingest, args.store)
+        print(f"Ingested {row_count} rows from {file_count} files into {args.store}")
+
+    # Reads the test and the flow of every file in the store
+    try:
+        with open(os.path.join(args.store, "files.json")) as files_file:
+            files = json.load(files_file)
+    except FileNotFoundError:
+        sys.exit(f"Error: There is no store in {args.store}, use the -i flag to ingest the measurements")
+
+    # Printing the summaries, where a store from before the latency table has no latency files
+    summarize_rtt(args.store, files)
+    print()
+    if os.path.exists(os.path.join(args.store, "latency.file")):
+        summarize_latency(args.store, files)
+        print()
+    throughputs = summarize_throughput(args.store, files)
+    print()
+    summarize_fairness(throughputs, concurrent_flows(args.matrix))
@@ -0,0 +1,209 @@
+'''
+
+Microbenchmark of the send loop of the simpleperf client.
+
+Compares the old send loop, which reads the clock twice for every send (once
+for the '-t' duration and once for the '-i' interval), with the current loop,
+where a timer thread stops the stream and the loop only updates the counter.
+Both loops send to a simpleperf server on the loopback interface, and for
+every buffer size the benchmark prints the sends per second, the CPU time per
+send and the clock reads per send. The clock reads are counted in a second,
+shorter run of every loop, where every clock function of the time module is
+wrapped with a counter of the calls from the thread of the loop, so the
+wrappers do not slow down the run that the sends and the CPU time are taken
+from.
+
+    python3 benchmarks/bench_client_loop.py -t 3
+
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from socket import *
+
+# The simpleperf module is imported from the directory next to this one
+SIMPLEPERF_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simpleperf")
+sys.path.insert(0, SIMPLEPERF_DIR)
+
+import simpleperf
+
+# The clock functions of the time module that a loop could read the time with
+CLOCK_FUNCTIONS = ["time", "time_ns", "monotonic", "monotonic_ns", "perf_counter", "perf_counter_ns"]
+
+# Counts the calls of every clock function of the time module from the thread that creates it, while it is entered
+# The simpleperf module reads the clock through the same time module, so the calls of the timer and the stream are counted as well
+class ClockCounter:
+    def __init__(self):
+        self.reads = 0
+        self.thread = threading.get_ident()
+        self.originals = {}
+
+    # This function returns a clock function that counts the calls from the thread of the counter
+    def wrap(self, function):
+        def counted_function():
+            if threading.get_ident() == self.thread:
+                self.reads += 1
+            return function()
+        return counted_function
+
+    # Replaces every clock function with one that counts its calls
+    def __enter__(self):
+        self.originals = {name: getattr(time, name) for name in CLOCK_FUNCTIONS}
+        for name, function in self.originals.items():
+            setattr(time, name, self.wrap(function))
+        return self
+
+    # Restores the clock functions
+    def __exit__(self, *exc_info):
+        for name, function in self.originals.items():
+            setattr(time, name, function)
+
+# This function will parse the command-line arguments
+def parse_args():
+    # Defines and parses the command-line argument
+    parser = argparse.ArgumentParser(description = 'Simpleperf client loop benchmark')
+
+    # '-p' flag: Sets the port number that the server will listen on
+    parser.add_argument('-p', '--port', type = int, default = 8095, help = "Selects the port number")
+
+    # '-t' flag: Sets the duration in seconds of every run
+    parser.add_argument('-t', '--time', type = int, default = 3, help = "Duration in seconds of every run")
+
+    # '-c' flag: Sets the duration in seconds of the run that counts the clock reads
+    parser.add_argument('-c', '--count-time', type = int, default = 1, help = "Duration in seconds of the run that counts the clock reads")
+
+    # '-l' flag: Sets the buffer sizes of the runs
+    parser.add_argument('-l', '--length', type = str, nargs = '+', default = ['1000B', '8KB', '128KB'], help = "Buffer sizes of the runs (B/KB/MB)")
+
+    # Returns the parsed command-line arguments
+    return parser.parse_args()
+
+# This function is the send loop of the client before the timer, which reads the clock twice for every send
+def old_loop(client_socket, payload, input_time, input_interval_time):
+    # Starting time of the transfer and of the last interval
+    start_time = time.time()
+    current_time = start_time
+
+    # Starting value of sent bytes, in total and in the interval
+    total_sent_bytes = 0
+    interval_sent_bytes = 0
+
+    # Amount of sends
+    sends = 0
+
+    # Transfer the bytes, where both the duration and the interval are checked for every send
+    # The same sendall() as the current loop is used, so only the loop itself differs
+    while (time.time() - start_time) < input_time:
+        sending_bytes = simpleperf.send_payload(client_socket, payload, None, len(payload))
+        total_sent_bytes += sending_bytes
+        interval_sent_bytes = interval_sent_bytes + sending_bytes
+        sends += 1
+        if time.time() - current_time >= input_interval_time:
+            current_time = current_time + input_interval_time
+            interval_sent_bytes = 0
+
+    # Returns the amount of sends and sent bytes
+    return sends, total_sent_bytes
+
+# This function is the current send loop of the client, which is stopped by the timer of simpleperf
+def new_loop(client_socket, payload, input_time, input_interval_time):
+    # The state of the stream, which the timer stops when the duration has passed
+    stream = simpleperf.Stream("benchmark")
+
+    # Set when the loop has finished, which stops the timer
+    finished = threading.Event()
+
+    # The timer prints nothing, since the output of the interval reports is not part of the loop
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            timer = threading.Thread(target=simpleperf.run_client_timer, args=([stream], input_time, input_interval_time, "MB", finished))
+            timer.start()
+
+            # Amount of sends
+            sends = 0
+
+            # Transfer the bytes until the timer stops the stream
+            stream.start_clock()
+            while stream.running:
+                stream.bytes += simpleperf.send_payload(client_socket, payload, None, len(payload))
+                sends += 1
+
+            # Stops the timer
+            finished.set()
+            timer.join()
+        finally:
+            sys.stdout = stdout
+
+    # Returns the amount of sends and sent bytes
+    return sends, stream.bytes
+
+# This function runs a send loop against the server and returns its sends, sent bytes and CPU time, and its clock reads if they are counted
+def run_loop(loop_function, port, length, input_time, count_clock = False):
+    # Connects to the server, sends the parameters of the test and starts the stream
+    client_socket = create_connection(("127.0.0.1", port))
+    simpleperf.start_test(client_socket, {"time": input_time, "num": None, "length": length})
+    simpleperf.send_message(client_socket, simpleperf.MESSAGE_START, {})
+
+    # The payload that is sent in every call
+    payload = memoryview(b"0" * length)
+
+    # CPU time of this thread before and after the loop, where the clock reads of this thread are counted if asked for
+    clock_counter = ClockCounter()
+    cpu_start = time.thread_time_ns()
+    if count_clock:
+        with clock_counter:
+            sends, sent_bytes = loop_function(client_socket, payload, input_time, 1)
+    else:
+        sends, sent_bytes = loop_function(client_socket, payload, input_time, 1)
+    cpu_time = time.thread_time_ns() - cpu_start
+
+    # Ends the transfer and waits for the results from the server
+    client_socket.shutdown(SHUT_WR)
+    simpleperf.recv_message(client_socket)
+    client_socket.close()
+
+    # Returns the results of the loop
+    return sends, sent_bytes, cpu_time, clock_counter.reads
+
+# This function prints a row of the benchmark table
+def print_row(data):
+    # Prints out the data element in a single row
+    print(("{:>16}" * len(data)).format(*data))
+
+# This is the main entry point of the benchmark
+if __name__ == '__main__':
+    # Parses the command line arguments
+    args = parse_args()
+
+    # Starts the server, where the output of every connection is discarded
+    server = subprocess.Popen([sys.executable, os.path.join(SIMPLEPERF_DIR, "simpleperf.py"), "-s", "-p", str(args.port)], stdout = subprocess.DEVNULL)
+
+    try:
+        # Waiting until the server accepts connections
+        while True:
+            try:
+                create_connection(("127.0.0.1", args.port)).close()
+                break
+            except ConnectionRefusedError:
+                time.sleep(0.05)
+
+        # Printing the headers of the table
+        print_row(["Loop", "Buffer", "Sends/s", "CPU us/send", "Clock/send", "Throughput"])
+
+        # Runs both loops for every buffer size
+        for length in args.length:
+            for name, loop_function in (("old", old_loop), ("timer", new_loop)):
+                sends, sent_bytes, cpu_time, clock_reads = run_loop(loop_function, args.port, simpleperf.format_num(length), args.time)
+
+                # The clock reads are counted in a run of their own, since the counter slows down every read
+                count_sends, count_sent_bytes, count_cpu_time, clock_reads = run_loop(loop_function, args.port, simpleperf.format_num(length), args.count_time, True)
+                print_row([name, length, f"{sends / args.time:.0f}", f"{cpu_time / 1000 / sends:.2f}", f"{clock_reads / count_sends:.3f}", f"{sent_bytes * 8e-6 / args.time:.2f} Mbps"])
+    finally:
+        # Stops the server
+        server.terminate()
+        server.wait()
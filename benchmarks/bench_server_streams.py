@@ -0,0 +1,228 @@
+'''
+
+Benchmark of the per-connection overhead of the simpleperf server.
+
+Starts a simpleperf server on the loopback interface, once with a thread per
+connection and once with the '-E' event loop, and opens 1, 100 and 1000
+streams against it. For every run it prints the memory and CPU time that the
+server spends per connection, how evenly the server has served the streams as
+the Jain fairness index of the bytes of every stream, and the round-trip time
+of a probe on a connection of its own that the server sends back while the
+streams run. A server that lets a busy stream keep it to itself shows a low
+fairness index and a high probe latency. The median round-trip time of the
+probe is also printed as a multiple of the median of the threaded server with
+the same amount of streams, so a latency regression of the event loop shows
+up next to its throughput.
+
+    python3 benchmarks/bench_server_streams.py -t 5
+
+'''
+
+import argparse
+import os
+import selectors
+import subprocess
+import sys
+import threading
+import time
+from socket import *
+
+# The simpleperf module is imported from the directory next to this one
+SIMPLEPERF_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simpleperf")
+sys.path.insert(0, SIMPLEPERF_DIR)
+
+import simpleperf
+
+# The amount of clock ticks per second, used to convert the CPU time in /proc
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+# This function will parse the command-line arguments
+def parse_args():
+    # Defines and parses the command-line argument
+    parser = argparse.ArgumentParser(description = 'Simpleperf server stream benchmark')
+
+    # '-p' flag: Sets the port number that the server will listen on
+    parser.add_argument('-p', '--port', type = int, default = 8090, help = "Selects the port number")
+
+    # '-t' flag: Sets the duration in seconds of every run
+    parser.add_argument('-t', '--time', type = int, default = 5, help = "Duration in seconds of every run")
+
+    # '-s' flag: Sets the number of streams of every run
+    parser.add_argument('-s', '--streams', type = int, nargs = '+', default = [1, 100, 1000], help = "Number of streams of every run")
+
+    # '-l' flag: Sets the size of the buffer used by the server and the clients
+    parser.add_argument('-l', '--length', type = str, default = '128KB', help = "Size of the buffer (B/KB/MB)")
+
+    # Returns the parsed command-line arguments
+    return parser.parse_args()
+
+# This function reads the resident memory in kilobytes and the CPU time in seconds of a process
+def read_process_usage(pid):
+    # The resident memory is found in the status file of the process
+    with open(f"/proc/{pid}/status") as status_file:
+        rss = next(int(line.split()[1]) for line in status_file if line.startswith("VmRSS:"))
+
+    # The user and system time are the 14th and 15th fields of the stat file
+    with open(f"/proc/{pid}/stat") as stat_file:
+        fields = stat_file.read().rsplit(")", 1)[1].split()
+
+    # Returns the memory and the CPU time of the process
+    return rss, (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+# This function starts a simpleperf server and waits until it is listening
+def start_server(port, length, event_loop):
+    # Defining the command that starts the server
+    command = [sys.executable, os.path.join(SIMPLEPERF_DIR, "simpleperf.py"), "-s", "-p", str(port), "-l", length]
+
+    # If the server should run in an event loop
+    if event_loop:
+        command.append("-E")
+
+    # Starts the server, where the output of every connection is discarded
+    server = subprocess.Popen(command, stdout = subprocess.DEVNULL)
+
+    # Waiting until the server accepts connections
+    while True:
+        try:
+            create_connection(("127.0.0.1", port)).close()
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+
+    # Returns the server process
+    return server
+
+# This function sends a single byte on the probe connection every probe interval and records the round-trip time, until the run is done
+def run_probe(probe_socket, histogram, done):
+    # Every message is sent at once instead of waiting for more bytes to fill a packet
+    probe_socket.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+
+    # Continues until the streams are done
+    while not done.wait(simpleperf.PROBE_INTERVAL):
+        send_time = time.monotonic_ns()
+        probe_socket.sendall(b"0")
+        if not probe_socket.recv(1):
+            return
+        histogram.record(time.monotonic_ns() - send_time)
+
+# This function returns the Jain fairness index of the bytes of every stream, which is 1.0 when every stream has sent the same amount
+def jain_index(values):
+    squares = sum(value * value for value in values)
+    return sum(values) ** 2 / (len(values) * squares) if squares else 0.0
+
+# This function runs the given amount of streams against the server
+# Returns the amount of bytes sent, the usage of the server, the fairness index of the streams and the round-trip times of the probe
+def run_streams(server_pid, port, streams, duration, length):
+    # Defining the list of the sockets of every stream, and the bytes that every stream has sent
+    sockets = []
+    sent_bytes = {}
+
+    # Connects every stream, sends the parameters of the test and starts the stream
+    for i in range(streams):
+        client_socket = create_connection(("127.0.0.1", port))
+        simpleperf.start_test(client_socket, {"time": duration, "num": None, "length": length})
+        simpleperf.send_message(client_socket, simpleperf.MESSAGE_START, {})
+        client_socket.setblocking(False)
+        sockets.append(client_socket)
+        sent_bytes[client_socket] = 0
+
+    # The probe sends single bytes that the server sends back, as the '--probe' flag of the client does
+    probe_socket = create_connection(("127.0.0.1", port))
+    simpleperf.start_test(probe_socket, {"rr": True, "probe": True, "time": None, "num": None, "length": 1})
+    histogram = simpleperf.Histogram()
+    done = threading.Event()
+    probe = threading.Thread(target=run_probe, args=(probe_socket, histogram, done))
+    probe.start()
+
+    # The payload that every stream sends
+    payload = memoryview(b"0" * length)
+
+    # Sends on every socket that is writable until the duration has passed
+    with selectors.DefaultSelector() as selector:
+        for client_socket in sockets:
+            selector.register(client_socket, selectors.EVENT_WRITE)
+
+        # Ending time of the run
+        end_time = time.monotonic() + duration
+
+        # Continues until the end of the run
+        while time.monotonic() < end_time:
+            for key, events in selector.select(timeout = 0.1):
+                try:
+                    sent_bytes[key.fileobj] += key.fileobj.send(payload)
+                except BlockingIOError:
+                    pass
+
+    # Measures the usage of the server while every stream is still connected
+    rss, cpu = read_process_usage(server_pid)
+
+    # Stops the probe, where closing its sending side ends the connection on the server
+    done.set()
+    probe.join()
+    probe_socket.shutdown(SHUT_WR)
+    simpleperf.recv_message(probe_socket)
+    probe_socket.close()
+
+    # Ends the transfer on every stream and waits for the results from the server
+    for client_socket in sockets:
+        client_socket.setblocking(True)
+        client_socket.shutdown(SHUT_WR)
+    for client_socket in sockets:
+        simpleperf.recv_message(client_socket)
+        client_socket.close()
+
+    # Returns the amount of sent bytes, the usage of the server, the fairness of the streams and the round-trip times of the probe
+    return sum(sent_bytes.values()), rss, cpu, jain_index(list(sent_bytes.values())), histogram
+
+# This function prints a row of the benchmark table
+def print_row(data):
+    # Prints out the data element in a single row
+    print(("{:>16}" * len(data)).format(*data))
+
+# This is the main entry point of the benchmark
+if __name__ == '__main__':
+    # Parses the command line arguments
+    args = parse_args()
+
+    # Defining the size of the buffer in bytes
+    length = simpleperf.format_num(args.length)
+
+    # Printing the headers of the table
+    print_row(["Server", "Streams", "RSS/stream", "CPU ms/GB", "Throughput", "Fairness"] + [f"Probe p{percentile}" for percentile in simpleperf.PROBE_PERCENTILES] + ["p50 vs threads"])
+
+    # The median round-trip time of the probe of the threaded server for every amount of streams, which the event loop is compared against
+    thread_medians = {}
+
+    # Every run uses its own port, so the sockets of the last run in TIME_WAIT do not matter
+    port = args.port
+
+    # Runs every combination of server mode and amount of streams
+    for event_loop in (False, True):
+        for streams in args.streams:
+            # Starts the server and measures its usage before the streams connect
+            server = start_server(port, args.length, event_loop)
+            start_rss, start_cpu = read_process_usage(server.pid)
+
+            # Runs the streams and measures the usage of the server at the peak
+            sent_bytes, end_rss, end_cpu, fairness, histogram = run_streams(server.pid, port, streams, args.time, length)
+
+            # Stops the server
+            server.terminate()
+            server.wait()
+
+            # Calculates the overhead per stream and per transferred gigabyte
+            rss_per_stream = (end_rss - start_rss) / streams
+            cpu_per_gigabyte = (end_cpu - start_cpu) * 1000 / (sent_bytes / 1e9) if sent_bytes else 0.0
+
+            # The median round-trip time of the probe as a multiple of the threaded server, where the threaded server runs first
+            median = histogram.percentile(50)
+            if not event_loop:
+                thread_medians[streams] = median
+            baseline = thread_medians.get(streams)
+            ratio = f"{median / baseline:.1f}x" if median is not None and baseline else "-"
+
+            # Printing the row of the run
+            print_row(["event loop" if event_loop else "threads", streams, f"{rss_per_stream:.1f} KB", f"{cpu_per_gigabyte:.1f}", f"{sent_bytes * 8e-6 / args.time:.2f} Mbps", f"{fairness:.3f}"] + simpleperf.probe_columns(histogram) + [ratio])
+
+            # The next run uses the next port
+            port += 1
@@ -0,0 +1,231 @@
+'''
+
+Regression suite of the simpleperf engine over the loopback interface.
+
+Runs a simpleperf server and client as subprocesses on 127.0.0.1 for every
+combination of buffer size, amount of parallel connections, '-t' or '-n' mode
+and output format. For every case it prints the throughput in Gbit/s, which
+the server measures, and the CPU time that the server and the client together
+spend per transferred gigabyte, read with getrusage() when both have exited.
+The CPU time that starting the two interpreters takes is measured once with a
+transfer of a single byte, and left out of every case, so short '-n' runs are
+not dominated by it. A run whose CPU time is not above the startup by more than
+the spread of the startup runs is too small to measure, and a case where most
+runs are too small prints n/a instead of a CPU time, and is not compared on its
+CPU time. Every case runs the given amount of times and the median is kept, so
+a single noisy run does not decide the result.
+
+The results can be saved as a baseline, and a later run compares every case
+against it: a case whose throughput has dropped, or whose CPU time per
+gigabyte has grown, by more than the threshold is a regression, and the suite
+exits with an error so it can guard a deployment.
+
+    python3 benchmarks/bench_suite.py --save benchmarks/baseline.json
+    python3 benchmarks/bench_suite.py --baseline benchmarks/baseline.json --threshold 10
+
+'''
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+# The simpleperf script in the directory next to this one
+SIMPLEPERF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simpleperf", "simpleperf.py")
+
+# How long the suite waits for a server to listen
+SERVER_TIMEOUT = 10
+
+# The smallest CPU time in seconds that getrusage() tells apart from the startup, since the kernel may account CPU time in clock ticks
+CPU_RESOLUTION = 0.01
+
+# The flags of every output format
+FORMAT_FLAGS = {"table": [], "json": ["--json"], "csv": ["--csv"]}
+
+# This function will parse the command-line arguments
+def parse_args():
+    # Defines and parses the command-line argument
+    parser = argparse.ArgumentParser(description = 'Simpleperf regression suite')
+
+    # '-p' flag: Sets the port number of the first run, where every run uses the next port
+    parser.add_argument('-p', '--port', type = int, default = 8100, help = "Port number of the first run")
+
+    # '-t' flag: Sets the duration in seconds of every run in the '-t' mode
+    parser.add_argument('-t', '--time', type = int, default = 2, help = "Duration in seconds of every run in the time mode")
+
+    # '-n' flag: Sets the amount of bytes that every connection sends in the '-n' mode
+    parser.add_argument('-n', '--num', type = str, default = '500MB', help = "Bytes that every connection sends in the num mode (B/KB/MB)")
+
+    # '-l' flag: Sets the buffer sizes of the runs
+    parser.add_argument('-l', '--length', type = str, nargs = '+', default = ['8KB', '128KB'], help = "Buffer sizes of the runs (B/KB/MB)")
+
+    # '-P' flag: Sets the amounts of parallel connections of the runs
+    parser.add_argument('-P', '--parallel', type = int, nargs = '+', default = [1, 4], help = "Amounts of parallel connections of the runs")
+
+    # '-m' flag: Sets the modes of the runs, which either run for the '-t' duration or send the '-n' bytes
+    parser.add_argument('-m', '--modes', type = str, nargs = '+', choices = ['time', 'num'], default = ['time', 'num'], help = "Modes of the runs")
+
+    # '-o' flag: Sets the output formats of the client in the runs
+    parser.add_argument('-o', '--formats', type = str, nargs = '+', choices = list(FORMAT_FLAGS), default = list(FORMAT_FLAGS), help = "Output formats of the client in the runs")
+
+    # '-r' flag: Sets the amount of times every case runs, where the median is kept
+    parser.add_argument('-r', '--repeat', type = int, default = 3, help = "Number of runs of every case")
+
+    # '--save' flag: Saves the results as a baseline
+    parser.add_argument('--save', type = str, help = "Path to save the results as a baseline")
+
+    # '--baseline' flag: Compares the results against a saved baseline
+    parser.add_argument('--baseline', type = str, help = "Path of the baseline to compare against")
+
+    # '--threshold' flag: Sets the change in percent that counts as a regression
+    parser.add_argument('--threshold', type = float, default = 10.0, help = "Change in percent of the throughput or the CPU time per GB that is a regression")
+
+    # Returns the parsed command-line arguments
+    args = parser.parse_args()
+    if args.repeat < 1 or args.threshold <= 0:
+        parser.error("the number of runs and the threshold must be positive")
+    return args
+
+# This function returns the name of a case, which is the key of the case in the baseline
+def case_name(length, parallel, mode, output_format):
+    return f"{length} P{parallel} {mode} {output_format}"
+
+# This function starts a simpleperf server that handles a single client and prints its results as JSON, and waits until it is listening
+def start_server(port, length):
+    # The messages of the server go to the standard error, and the records to the standard output
+    server = subprocess.Popen([sys.executable, SIMPLEPERF, "-s", "-p", str(port), "-l", length, "--one-off", "--json"], stdout = subprocess.PIPE, stderr = subprocess.PIPE, text = True)
+
+    # Waiting for the message that the server is listening
+    end_time = time.monotonic() + SERVER_TIMEOUT
+    while time.monotonic() < end_time:
+        line = server.stderr.readline()
+        if not line:
+            break
+        if "is listening" in line:
+            return server
+
+    # The server did not start
+    server.kill()
+    sys.exit(f"Error: The server on port {port} did not start")
+
+# This function runs a single case, and returns the bytes that the server has received, the duration in nanoseconds and the CPU time in seconds of the server and the client
+def run_case(port, length, parallel, mode, output_format, args, num = None):
+    # The usage of every process that this process has waited for so far
+    start_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    # Starts the server, and the client when the server is listening, where the output of the client is discarded
+    server = start_server(port, length)
+    command = [sys.executable, SIMPLEPERF, "-c", "-p", str(port), "-l", length, "-P", str(parallel)] + FORMAT_FLAGS[output_format]
+    command += ["-t", str(args.time)] if mode == "time" else ["-n", num or args.num]
+    client = subprocess.run(command, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+
+    # The server exits when the connections of the client are done
+    records = server.communicate(timeout = SERVER_TIMEOUT)[0]
+    if client.returncode != 0 or server.returncode != 0:
+        sys.exit(f"Error: The case {case_name(length, parallel, mode, output_format)} failed")
+
+    # The CPU time of the server and the client together, which are both done
+    end_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_time = (end_usage.ru_utime - start_usage.ru_utime) + (end_usage.ru_stime - start_usage.ru_stime)
+
+    # The transfer is every byte the server has received, over the time of the longest connection
+    streams = [record for record in map(json.loads, records.splitlines()) if record["event"] == "stream"]
+    total_bytes = sum(record["bytes"] for record in streams)
+    duration = max(record["end"] - record["start"] for record in streams)
+
+    # Returns the bytes, the duration and the CPU time
+    return total_bytes, duration, cpu_time
+
+# This function compares a result against the baseline, and returns the change of the throughput and the CPU time in percent, and if it is a regression
+# The change of the CPU time is None if the result or the baseline is too small to measure
+def compare(result, baseline, threshold):
+    throughput_change = (result["gbits_per_second"] / baseline["gbits_per_second"] - 1) * 100
+    cpu_change = None
+    if result["cpu_seconds_per_gb"] is not None and baseline["cpu_seconds_per_gb"]:
+        cpu_change = (result["cpu_seconds_per_gb"] / baseline["cpu_seconds_per_gb"] - 1) * 100
+    return throughput_change, cpu_change, throughput_change < -threshold or (cpu_change is not None and cpu_change > threshold)
+
+# This function returns the CPU time per gigabyte of a case from the CPU time per gigabyte of every run, or None if most runs are too small to measure
+def median_cpu(values):
+    measured = [value for value in values if value is not None]
+    return statistics.median(measured) if len(measured) * 2 > len(values) else None
+
+# This function prints a row of the benchmark table
+def print_row(data):
+    # Prints out the data element in a single row
+    print(("{:>16}" * len(data)).format(*data))
+
+# This is the main entry point of the benchmark
+if __name__ == '__main__':
+    # Parses the command line arguments
+    args = parse_args()
+
+    # Reads the baseline, where a baseline of another machine or Python version is only a rough guide
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["machine"] != platform.node() or baseline["python"] != platform.python_version():
+            print(f"Warning: The baseline was recorded on {baseline['machine']} with Python {baseline['python']}", file = sys.stderr)
+
+    # Printing the headers of the table
+    print_row(["Buffer", "Streams", "Mode", "Format", "Gbit/s", "CPU s/GB"] + (["Gbit/s diff", "CPU diff", "Result"] if baseline else []))
+
+    # The results of every case, and the names of the cases that have regressed
+    results = {}
+    regressions = []
+
+    # Every run uses its own port, so the sockets of the last run in TIME_WAIT do not matter
+    port = args.port
+
+    # The CPU time of starting the server and the client, from a transfer of a single byte
+    startup_runs = []
+    for i in range(args.repeat):
+        startup_runs.append(run_case(port, args.length[0], 1, "num", "table", args, "1B")[2])
+        port += 1
+    startup_cpu_time = statistics.median(startup_runs)
+
+    # The CPU time of a transfer must be above the startup by more than the spread of the startup runs to be told apart from it
+    cpu_noise = max(max(startup_runs) - min(startup_runs), CPU_RESOLUTION)
+
+    # Runs every case, where the median of the runs is kept
+    for length in args.length:
+        for parallel in args.parallel:
+            for mode in args.modes:
+                for output_format in args.formats:
+                    # The throughput in Gbit/s and the CPU time per gigabyte of every run
+                    runs = []
+                    for i in range(args.repeat):
+                        total_bytes, duration, cpu_time = run_case(port, length, parallel, mode, output_format, args)
+                        transfer_cpu_time = cpu_time - startup_cpu_time
+                        runs.append((total_bytes * 8 / duration, transfer_cpu_time / (total_bytes / 1e9) if transfer_cpu_time > cpu_noise else None))
+                        port += 1
+                    name = case_name(length, parallel, mode, output_format)
+                    results[name] = {"gbits_per_second": statistics.median(run[0] for run in runs), "cpu_seconds_per_gb": median_cpu([run[1] for run in runs])}
+                    cpu_per_gigabyte = results[name]["cpu_seconds_per_gb"]
+                    row = [length, parallel, mode, output_format, f"{results[name]['gbits_per_second']:.2f}", f"{cpu_per_gigabyte:.3f}" if cpu_per_gigabyte is not None else "n/a"]
+
+                    # Compares the case against the baseline, if the baseline has it
+                    if baseline is not None:
+                        if name in baseline["cases"]:
+                            throughput_change, cpu_change, regressed = compare(results[name], baseline["cases"][name], args.threshold)
+                            row += [f"{throughput_change:+.1f}%", f"{cpu_change:+.1f}%" if cpu_change is not None else "n/a", "REGRESSION" if regressed else "ok"]
+                            if regressed:
+                                regressions.append(name)
+                        else:
+                            row += ["-", "-", "new"]
+                    print_row(row)
+
+    # Saves the results as a baseline
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump({"machine": platform.node(), "python": platform.python_version(), "time": args.time, "num": args.num, "repeat": args.repeat, "cases": results}, baseline_file, indent = 2)
+
+    # A regression fails the suite
+    if regressions:
+        sys.exit(f"Error: {len(regressions)} cases regressed by more than {args.threshold:g}%: {', '.join(regressions)}")
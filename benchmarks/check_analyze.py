@@ -0,0 +1,111 @@
+'''
+
+Checks that analyze_measurements.py ingests every kind of simpleperf output.
+
+Runs a simpleperf server on 127.0.0.1 and three clients with the '--json' flag:
+a bulk transfer with parallel connections, a '--rr' transfer and a bulk
+transfer with the '--probe' flag, as well as a bulk transfer in the table
+format. The output of every client is written to a test directory of its own,
+the directory is ingested into a new store, and the check fails if a flow is
+missing from the throughput or the latency table of the store, or if the
+summary of the store fails.
+
+    python3 benchmarks/check_analyze.py
+
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# The directory of this repository, where analyze_measurements.py is
+REPOSITORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# The simpleperf script in the directory next to this one
+SIMPLEPERF = os.path.join(REPOSITORY, "simpleperf", "simpleperf.py")
+ANALYZE = os.path.join(REPOSITORY, "analyze_measurements.py")
+
+sys.path.insert(0, REPOSITORY)
+
+import analyze_measurements
+
+# How long the check waits for a server to listen
+SERVER_TIMEOUT = 10
+
+# The flows of the check: the name of the output file, the flags of the client, and the tables that the flow must be in
+FLOWS = [
+    ("throughput_bulk.jsonl", ["-P", "2", "--json"], {"throughput"}),
+    ("latency_rr.jsonl", ["--rr", "1B", "--json"], {"latency"}),
+    ("throughput_probe.jsonl", ["-P", "2", "--probe", "--json"], {"throughput", "latency"}),
+    ("throughput_table.txt", ["-P", "2"], {"throughput"}),
+]
+
+# This function will parse the command-line arguments
+def parse_args():
+    # Defines and parses the command-line argument
+    parser = argparse.ArgumentParser(description = 'Checks the ingest of analyze_measurements.py')
+
+    # '-p' flag: Sets the port number of the server
+    parser.add_argument('-p', '--port', type = int, default = 8150, help = "Port number of the server")
+
+    # '-t' flag: Sets the duration in seconds of every client
+    parser.add_argument('-t', '--time', type = int, default = 1, help = "Duration in seconds of every client")
+
+    # Returns the parsed command-line arguments
+    return parser.parse_args()
+
+# This function starts a simpleperf server, and waits until it is listening
+def start_server(port):
+    # With the '--json' flag, the messages of the server go to the standard error, which is read until the server is listening
+    server = subprocess.Popen([sys.executable, SIMPLEPERF, "-s", "-p", str(port), "--json"], stdout = subprocess.DEVNULL, stderr = subprocess.PIPE, text = True)
+    for line in server.stderr:
+        if "is listening" in line:
+            return server
+
+    # The server did not start
+    server.kill()
+    sys.exit(f"Error: The server on port {port} did not start")
+
+# This is the main entry point of the check
+if __name__ == '__main__':
+    # Parses the command line arguments
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Runs every client against the same server, where the output of every client is a file of the test directory
+        test_directory = os.path.join(directory, "test-case-check")
+        os.makedirs(test_directory)
+        server = start_server(args.port)
+        try:
+            for name, flags, tables in FLOWS:
+                with open(os.path.join(test_directory, name), "w") as output_file:
+                    client = subprocess.run([sys.executable, SIMPLEPERF, "-c", "-p", str(args.port), "-t", str(args.time)] + flags, stdout = output_file, stderr = subprocess.PIPE, text = True, timeout = args.time + SERVER_TIMEOUT)
+                if client.returncode != 0:
+                    sys.exit(f"Error: The client of {name} failed: {client.stderr}")
+        finally:
+            server.terminate()
+            server.wait(SERVER_TIMEOUT)
+
+        # Ingests the test directory into a new store
+        store = os.path.join(directory, "store")
+        file_count, row_count = analyze_measurements.ingest([test_directory], store)
+        with open(os.path.join(store, "files.json")) as files_file:
+            files = {os.path.basename(record["path"]): set(record["kinds"]) for record in json.load(files_file)}
+
+        # Every flow must be in the tables of its output
+        failures = [f"{name}: expected {sorted(tables)}, ingested {sorted(files.get(name, set()))}" for name, flags, tables in FLOWS if files.get(name) != tables]
+
+        # The summary of the store must read every table back
+        summary = subprocess.run([sys.executable, ANALYZE, "-s", store, "-m", os.path.join(directory, "matrix.json")], capture_output = True, text = True)
+        if summary.returncode != 0:
+            failures.append(f"The summary failed: {summary.stderr}")
+
+    # Printing the result of the check
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(f"Error: {len(failures)} of the checks failed")
+    print(f"OK: Ingested {row_count} rows from {file_count} files, and summarized the store")
@@ -42,6 +42,11 @@ from mininet.node import Node
 from mininet.log import setLogLevel, info
 from mininet.cli import CLI
 from mininet.link import TCLink
+import time
+
+
+# The offloads that are turned off, so the links shape every packet on its own instead of large segments
+OFFLOADS = [ 'tso', 'gso', 'lro', 'gro', 'ufo' ]
 
 
 class LinuxRouter( Node ):
@@ -62,41 +67,52 @@ class PortfolioNetwork2410( Topo ):
 
     def build( self, **_opts ):
         #subnet A with three hosts (h1, h2, and h3), a switch, and a router (r1)
-        h1=self.addHost("h1",ip="10.0.0.2/24", defaultRoute='via 10.0.0.1')
-        h2=self.addHost("h2",ip="10.0.0.3/24", defaultRoute='via 10.0.0.1')
-        h3=self.addHost("h3",ip="10.0.0.4/24", defaultRoute='via 10.0.0.1')
+        h1=self.addHost("h1",ip="10.0.0.2/24", defaultRoute='via 10.0.0.1', offloads=['h1-eth0'])
+        h2=self.addHost("h2",ip="10.0.0.3/24", defaultRoute='via 10.0.0.1', offloads=['h2-eth0'])
+        h3=self.addHost("h3",ip="10.0.0.4/24", defaultRoute='via 10.0.0.1', offloads=['h3-eth0'])
         s1 = self.addSwitch("s1")         
-        r1=self.addNode("r1",cls=LinuxRouter,ip='10.0.0.1/24', defaultRoute='via 10.0.1.2')
+        r1=self.addNode("r1",cls=LinuxRouter,ip='10.0.0.1/24', defaultRoute='via 10.0.1.2', offloads=['r1-eth1'])
         for h in (h1,h2,h3):
             self.addLink(h,s1)
         self.addLink(s1,r1,intfName2='r1-eth0',params2={ 'ip' : '10.0.0.1/24' })#,max_queue_size=834, use_htb=True)
         
         #subnet B - r1 - r2
         
-        r2=self.addNode("r2",cls=LinuxRouter,ip='10.0.1.2/24') 
+        #ip route add ipA via ipB dev INTERFACE
+        #every packet going to ipA must first go to ipB using INTERFACE
+        r2=self.addNode("r2",cls=LinuxRouter,ip='10.0.1.2/24', offloads=['r2-eth2'],
+                        routes=[ ('10.0.0.0/24', '10.0.1.1', 'r2-eth0'),
+                                 ('10.0.4.0/24', '10.0.3.2', 'r2-eth2'),
+                                 ('10.0.5.0/24', '10.0.3.2', 'r2-eth2'),
+                                 ('10.0.6.0/24', '10.0.3.2', 'r2-eth2'),
+                                 ('10.0.7.0/24', '10.0.3.2', 'r2-eth2') ])
         self.addLink(r1,r2,intfName1='r1-eth1', params1={ 'ip' : '10.0.1.1/24' }, bw=40, delay='10ms', max_queue_size=67, use_htb=True)#,max_queue_size=834, use_htb=True)
         
         
         #subnet C  r2 - h7
-        h7=self.addHost("h7",ip="10.0.2.2/24", defaultRoute='via 10.0.2.1')
+        h7=self.addHost("h7",ip="10.0.2.2/24", defaultRoute='via 10.0.2.1', offloads=['h7-eth0'])
         self.addLink(r2,h7,intfName1='r2-eth1', params1={ 'ip' : '10.0.2.1/24' })#,max_queue_size=834, use_htb=True)
 
 
 
         #subnet D  r2 - r3
-        r3=self.addNode("r3",cls=LinuxRouter,ip='10.0.3.2/24') 
+        r3=self.addNode("r3",cls=LinuxRouter,ip='10.0.3.2/24', offloads=['r3-eth3'],
+                        routes=[ ('10.0.0.0/24', '10.0.3.1', 'r3-eth0'),
+                                 ('10.0.1.0/24', '10.0.3.1', 'r3-eth0'),
+                                 ('10.0.2.0/24', '10.0.3.1', 'r3-eth0'),
+                                 ('10.0.7.0/24', '10.0.6.2', 'r3-eth3') ])
         self.addLink(r2,r3,intfName1='r2-eth2', params1={ 'ip' : '10.0.3.1/24' }, bw=30, delay='20ms', max_queue_size=100, use_htb=True)#,max_queue_size=834, use_htb=True)
         
 	
 	    #subnet    r3  - H8
-        h8=self.addHost("h8",ip="10.0.4.2/24", defaultRoute='via 10.0.4.1')
+        h8=self.addHost("h8",ip="10.0.4.2/24", defaultRoute='via 10.0.4.1', offloads=['h8-eth0'])
         self.addLink(r3,h8,intfName1='r3-eth1', params1={ 'ip' : '10.0.4.1/24' })#,max_queue_size=834, use_htb=True)
 
 	
     	# subnet E  r3 - H4-H7
-        h4=self.addHost("h4",ip="10.0.5.2/24", defaultRoute='via 10.0.5.1')
-        h5=self.addHost("h5",ip="10.0.5.3/24", defaultRoute='via 10.0.5.1')
-        h6=self.addHost("h6",ip="10.0.5.4/24", defaultRoute='via 10.0.5.1')
+        h4=self.addHost("h4",ip="10.0.5.2/24", defaultRoute='via 10.0.5.1', offloads=['h4-eth0'])
+        h5=self.addHost("h5",ip="10.0.5.3/24", defaultRoute='via 10.0.5.1', offloads=['h5-eth0'])
+        h6=self.addHost("h6",ip="10.0.5.4/24", defaultRoute='via 10.0.5.1', offloads=['h6-eth0'])
         s2 = self.addSwitch("s2")         
         for h in (h4,h5,h6):
             self.addLink(h,s2)
@@ -111,60 +127,72 @@ class PortfolioNetwork2410( Topo ):
         
 	
 	    #subnet I: r4 - H9
-        h9=self.addHost("h9",ip="10.0.7.2/24", defaultRoute='via 10.0.7.1')
+        h9=self.addHost("h9",ip="10.0.7.2/24", defaultRoute='via 10.0.7.1', offloads=['h9-eth0'])
         self.addLink(r4,h9,intfName1='r4-eth1', params1={ 'ip' : '10.0.7.1/24' })#,max_queue_size=834, use_htb=True)
 
 
 
-topo = PortfolioNetwork2410()
-net = Mininet( topo=topo, link=TCLink )
-net.start()
+def configure_commands( node ):
+    """Returns the single shell command that adds the routes of a node with ip -batch,
+    and turns off every offload of its interfaces with one ethtool call per interface."""
+
+    commands = []
+    routes = node.params.get( 'routes', [] )
+    if routes:
+        lines = " ".join( "'route add %s via %s dev %s'" % route for route in routes )
+        commands.append( "printf '%%s\\n' %s | ip -batch -" % lines )
+    for intf in node.params.get( 'offloads', [] ):
+        commands.append( "ethtool -K %s %s" % ( intf, " ".join( "%s off" % feature for feature in OFFLOADS ) ) )
+    return "; ".join( commands )
+
+
+def configure_network( net ):
+    """Adds the static routes of the routers, and turns off the offloads of the links, so every packet is shaped on its own.
+    The command of every node is sent before waiting for any of them, so the nodes are configured at the same time."""
+
+    nodes = [ node for node in net.hosts if configure_commands( node ) ]
+    for node in nodes:
+        node.sendCmd( configure_commands( node ) )
+    for node in nodes:
+        node.waitOutput()
 
-#ip route add ipA via ipB dev INTERFACE
-#every packet going to ipA must first go to ipB using INTERFACE
-net["r2"].cmd("ip route add 10.0.0.0/24 via 10.0.1.1 dev r2-eth0")
-net["r2"].cmd("ip route add 10.0.4.0/24 via 10.0.3.2 dev r2-eth2")
-net["r2"].cmd("ip route add 10.0.5.0/24 via 10.0.3.2 dev r2-eth2")
-net["r2"].cmd("ip route add 10.0.6.0/24 via 10.0.3.2 dev r2-eth2")
-net["r2"].cmd("ip route add 10.0.7.0/24 via 10.0.3.2 dev r2-eth2")
 
-net["r3"].cmd("ip route add 10.0.0.0/24 via 10.0.3.1 dev r3-eth0")
-net["r3"].cmd("ip route add 10.0.1.0/24 via 10.0.3.1 dev r3-eth0")
-net["r3"].cmd("ip route add 10.0.2.0/24 via 10.0.3.1 dev r3-eth0")
-net["r3"].cmd("ip route add 10.0.7.0/24 via 10.0.6.2 dev r3-eth3")
+def start_network( topo=None ):
+    """Builds and starts the network of the portfolio, or of the given topology, ready to be measured.
+    Returns the network and the time in seconds that every step of the bring-up took."""
 
+    timings = {}
+    start = time.monotonic()
+    topo = topo or PortfolioNetwork2410()
+    net = Mininet( topo=topo, link=TCLink )
+    timings[ 'build' ] = time.monotonic() - start
 
-net["r1"].cmd("ethtool -K r1-eth1 tso off")
-net["r1"].cmd("ethtool -K r1-eth1 gso off")
-net["r1"].cmd("ethtool -K r1-eth1 lro off")
-net["r1"].cmd("ethtool -K r1-eth1 gro off")
-net["r1"].cmd("ethtool -K r1-eth1 ufo off")
+    start = time.monotonic()
+    net.start()
+    timings[ 'start' ] = time.monotonic() - start
 
+    start = time.monotonic()
+    configure_network( net )
+    timings[ 'configure' ] = time.monotonic() - start
 
-net["r2"].cmd("ethtool -K r2-eth2 tso off")
-net["r2"].cmd("ethtool -K r2-eth2 gso off")
-net["r2"].cmd("ethtool -K r2-eth2 lro off")
-net["r2"].cmd("ethtool -K r2-eth2 gro off")
-net["r2"].cmd("ethtool -K r2-eth2 ufo off")
+    info( '*** Bring-up: %s\n' % ', '.join( '%s %.2f s' % timing for timing in timings.items() ) )
+    return net, timings
 
 
-net["r3"].cmd("ethtool -K r3-eth3 tso off")
-net["r3"].cmd("ethtool -K r3-eth3 gso off")
-net["r3"].cmd("ethtool -K r3-eth3 lro off")
-net["r3"].cmd("ethtool -K r3-eth3 gro off")
-net["r3"].cmd("ethtool -K r3-eth3 ufo off")
+def stop_network( net ):
+    """Tears down the network, and returns the time in seconds that it took."""
 
-for i in range (1,10,1):
-    node = "h" + str(i)
-    iface = node + "-eth0" 
-    net[node].cmd("ethtool -K " + iface + " tso off")
-    net[node].cmd("ethtool -K " + iface + " gso off")
-    net[node].cmd("ethtool -K " + iface + " lro off")
-    net[node].cmd("ethtool -K " + iface + " gro off")
-    net[node].cmd("ethtool -K " + iface + " ufo off")
+    start = time.monotonic()
+    net.stop()
+    duration = time.monotonic() - start
+    info( '*** Tear-down: %.2f s\n' % duration )
+    return duration
 
 
 
-net.pingAll()
-CLI( net )
-net.stop()
\ No newline at end of file
+if __name__ == '__main__':
+    setLogLevel( 'info' )
+    net, timings = start_network()
+    net.pingAll()
+    CLI( net )
+    stop_network( net )
@@ -0,0 +1,264 @@
+'''
+
+Runs the measurements of the portfolio in the Mininet network of portfolio_topology.py without any manual steps.
+
+The tests are described in a JSON test matrix, such as measurements/matrix.json. The tests run in the network of the
+portfolio, or in a network of topology_generator.py if the matrix has a "topology" with its parameters. Every test is a set of flows
+that run at the same time, where a flow is either a simpleperf transfer from a client host to a server host, or a
+ping from one host to another. For every test, the runner starts a simpleperf server with the '--one-off' flag on
+every server host, waits until the servers are listening, and then starts every client and every ping at once in
+the namespaces of their hosts. When every flow is done, the output of every flow is written to the output
+directory, and a summary of every flow is written to results.json. The network is built once for the whole matrix,
+and is torn down when the runner is done, also when a test fails.
+
+    sudo python3 run_measurements.py -m measurements/matrix.json -o results
+
+'''
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from mininet.log import setLogLevel
+
+from portfolio_topology import start_network, stop_network
+from topology_generator import GeneratedNetwork
+
+# The path of simpleperf, which every host runs from the shared file system
+SIMPLEPERF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "simpleperf", "simpleperf.py")
+
+# The summary line of ping with the round-trip times in milliseconds
+PING_RTT = re.compile(r"= ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+) ms")
+
+# The summary line of ping with the share of lost packets
+PING_LOSS = re.compile(r"([\d.]+)% packet loss")
+
+# How long the runner waits for a server to listen
+SERVER_TIMEOUT = 10
+
+# Reads the output of a process in a thread of its own, so the runner can wait for a line with a deadline, and the pipes of every process are drained at the same time
+class OutputReader:
+    def __init__(self, process):
+        self.process = process
+        self.lines = []
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target = self.read_lines, daemon = True)
+        self.thread.start()
+
+    # Reads every line of the process until it closes its output
+    def read_lines(self):
+        for line in self.process.stdout:
+            with self.condition:
+                self.lines.append(line)
+                self.condition.notify_all()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    # Waits until a line holds the given text, and returns False if the process closes its output or the timeout runs out first
+    def wait_for(self, text, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or any(text in line for line in self.lines), timeout)
+            return any(text in line for line in self.lines)
+
+    # Waits until the process has exited, and returns every line of its output
+    def output(self, timeout = None):
+        self.process.wait(timeout)
+        self.thread.join()
+        return "".join(self.lines)
+
+# This function will parse the command-line arguments
+def parse_args():
+    # Defines and parses the command-line argument
+    parser = argparse.ArgumentParser(description = 'Runs a test matrix in the portfolio network')
+
+    # '-m' flag: Sets the path of the test matrix
+    parser.add_argument('-m', '--matrix', type = str, default = os.path.join("measurements", "matrix.json"), help = "Path of the JSON test matrix")
+
+    # '-o' flag: Sets the directory that the results are written to
+    parser.add_argument('-o', '--output', type = str, default = "results", help = "Directory of the results")
+
+    # '-k' flag: Only runs the tests whose name starts with one of the given names
+    parser.add_argument('-k', '--tests', type = str, nargs = '+', help = "Names of the tests to run, e.g. test-case-4")
+
+    # Returns the parsed command-line arguments
+    return parser.parse_args()
+
+# This function reads the test matrix, where every flow gets the default values of its test and of the matrix
+# Returns the tests and the parameters of the generated topology, if any
+def load_matrix(path):
+    # Reads the matrix
+    with open(path) as matrix_file:
+        matrix = json.load(matrix_file)
+
+    # The default values of every flow
+    defaults = {"type": "throughput", "time": matrix.get("time", 25), "count": matrix.get("count", 25), "parallel": 1}
+
+    # Fills in every flow
+    for test in matrix["tests"]:
+        for flow in test["flows"]:
+            for key, value in defaults.items():
+                flow.setdefault(key, test.get(key, value))
+
+            # The name of the output of the flow, as in the files of the measurements directory
+            name = flow.get("name", f"{flow['client']}-{flow['server']}")
+            flow["file"] = f"{flow['type']}_{name}" + (f"-{test['tag']}" if "tag" in test else "")
+
+    # Returns the tests and the topology
+    return matrix["tests"], matrix.get("topology")
+
+# This function starts a simpleperf server with the '--one-off' flag on the server host of a flow, and waits until it is listening
+def start_server(net, flow, port):
+    # The server listens on the address of the host that the client connects to
+    server_ip = flow.get("server_ip", net[flow["server"]].IP())
+
+    # Starts the server, where the messages are in the same pipe as the records
+    server = net[flow["server"]].popen([sys.executable, SIMPLEPERF, "-s", "-b", server_ip, "-p", str(port), "--one-off", "--json"], stdout = subprocess.PIPE, stderr = subprocess.STDOUT, text = True)
+
+    # Waiting for the message that the server is listening, where a server that hangs without any output is given up on as well
+    reader = OutputReader(server)
+    if reader.wait_for("is listening", SERVER_TIMEOUT):
+        return server, server_ip, reader
+
+    # The server did not start
+    server.kill()
+    raise RuntimeError(f"The server on {flow['server']} did not start: {reader.output()}")
+
+# This function starts the client of a flow, which is a simpleperf client, or a ping for a latency flow
+def start_client(net, flow, server_ip, port):
+    # A latency flow pings the server host
+    if flow["type"] == "latency":
+        command = ["ping", "-c", str(flow["count"]), server_ip]
+
+    # A throughput flow runs a simpleperf client that prints its results as records
+    else:
+        command = [sys.executable, SIMPLEPERF, "-c", "-I", server_ip, "-p", str(port), "-t", str(flow["time"]), "-P", str(flow["parallel"]), "--json"]
+        if flow.get("udp"):
+            command += ["-u", "--bitrate", flow.get("bitrate", "1M")]
+        command += flow.get("args", [])
+
+    # Starts the client in the namespace of its host
+    return net[flow["client"]].popen(command, stdout = subprocess.PIPE, stderr = subprocess.STDOUT, text = True)
+
+# This function summarizes the output of a flow
+def summarize(flow, output):
+    # The summary holds the flow itself
+    summary = {"client": flow["client"], "server": flow["server"], "type": flow["type"], "file": flow["file"]}
+
+    # A latency flow has the round-trip times and the loss of ping
+    if flow["type"] == "latency":
+        rtt = PING_RTT.search(output)
+        loss = PING_LOSS.search(output)
+        if rtt:
+            summary.update(zip(["rtt_min", "rtt_avg", "rtt_max", "rtt_mdev"], (float(value) for value in rtt.groups())))
+        if loss:
+            summary["loss"] = float(loss.group(1))
+        return summary
+
+    # A throughput flow has the records of the client, where the sum of several connections is the result of the flow
+    records = [json.loads(line) for line in output.splitlines() if line.startswith("{")]
+    results = [record for record in records if record["event"] == "sum"] or [record for record in records if record["event"] == "stream"]
+    summary["bits_per_second"] = sum(record["bits_per_second"] for record in results)
+    summary["bytes"] = sum(record["bytes"] for record in results)
+    summary["streams"] = [record for record in records if record["event"] == "stream"]
+    return summary
+
+# This function runs every flow of a test at the same time, and returns the summary of every flow
+def run_test(net, test, output_dir):
+    # The servers of the test, and the clients with their flows
+    servers = []
+    clients = []
+
+    try:
+        # Starts a server for every throughput flow, where every server has a port of its own
+        for port, flow in enumerate(test["flows"], 8088):
+            if flow["type"] == "latency":
+                flow["server_ip"] = flow.get("server_ip", net[flow["server"]].IP())
+            else:
+                server, flow["server_ip"], reader = start_server(net, flow, port)
+                servers.append((flow, server, reader))
+
+        # Starts every client and every ping at once, where the output of every client is read at the same time, so no client blocks on a full pipe
+        for port, flow in enumerate(test["flows"], 8088):
+            client = start_client(net, flow, flow["server_ip"], port)
+            clients.append((flow, client, OutputReader(client)))
+
+        # Waiting for every client to finish, and collecting its output
+        outputs = [(flow, reader.output()) for flow, client, reader in clients]
+
+        # Every server exits when its client is done
+        server_outputs = [(flow, reader.output(SERVER_TIMEOUT)) for flow, server, reader in servers]
+    finally:
+        # Tears down any process that is still running
+        for flow, process, reader in clients + servers:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    # Writing the output of every client and server, named as in the measurements directory
+    os.makedirs(output_dir, exist_ok = True)
+    for flow, output in outputs:
+        with open(os.path.join(output_dir, flow["file"] + (".txt" if flow["type"] == "latency" else ".jsonl")), "w") as output_file:
+            output_file.write(output)
+    for flow, output in server_outputs:
+        with open(os.path.join(output_dir, flow["file"] + "_server.jsonl"), "w") as output_file:
+            output_file.write(output)
+
+    # Returns the summary of every flow
+    return [dict(summarize(flow, output), test = test["name"]) for flow, output in outputs]
+
+# This function prints a row of the summary table
+def print_row(data):
+    # Prints out the data element in a single row
+    print(("{:>24}" * len(data)).format(*data))
+
+# This is the main entry point of the runner
+if __name__ == '__main__':
+    # Parses the command line arguments
+    args = parse_args()
+
+    # Reads the test matrix, and keeps the selected tests
+    tests, topology = load_matrix(args.matrix)
+    if args.tests:
+        tests = [test for test in tests if any(test["name"].startswith(name) for name in args.tests)]
+
+    # Builds the network once for every test, and prints how long every step of the bring-up took
+    setLogLevel("warning")
+    net, timings = start_network(GeneratedNetwork(**topology) if topology else None)
+    print("Bring-up: " + ", ".join(f"{step} {duration:.2f} s" for step, duration in timings.items()))
+
+    # The summary of every flow
+    results = []
+
+    try:
+        # Printing the headers of the table
+        print_row(["Test", "Flow", "Result", "Duration"])
+
+        # Runs the tests one after the other, where the flows of a test run at the same time
+        for test in tests:
+            start_time = time.monotonic()
+            summaries = run_test(net, test, os.path.join(args.output, test["name"]))
+            duration = time.monotonic() - start_time
+
+            # Printing the result of every flow
+            for summary in summaries:
+                if summary["type"] == "latency":
+                    result = f"{summary['rtt_avg']:.3f} ms" if "rtt_avg" in summary else "-"
+                else:
+                    result = f"{summary['bits_per_second'] / 1e6:.2f} Mbps"
+                print_row([test["name"], summary["file"], result, f"{duration:.1f} s"])
+            results.extend(summaries)
+    finally:
+        # Tears down the network, also when a test has failed
+        print(f"Tear-down: {stop_network(net):.2f} s")
+
+        # Writing the summary of every flow that has run
+        os.makedirs(args.output, exist_ok = True)
+        with open(os.path.join(args.output, "results.json"), "w") as results_file:
+            json.dump(results, results_file, indent = 2)
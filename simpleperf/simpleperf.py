@@ -4,6 +4,134 @@ import time
 import sys
 import threading
 import ipaddress
+import os
+import tempfile
+import struct
+import json
+import asyncio
+import multiprocessing
+import csv
+import io
+import signal
+import math
+
+# The usage of the process for the '--self-stats' flag, which is only found on Unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Every control message starts with this header: a magic value, the type of the message and the length of the payload
+CONTROL_HEADER = struct.Struct("!4sBI")
+
+# The magic value that identifies a simpleperf control message
+CONTROL_MAGIC = b"SPRF"
+
+# The version of the control protocol, which both sides must agree on
+CONTROL_VERSION = 2
+
+# Message type sent by the client before the transfer with the parameters of the test
+MESSAGE_PARAMS = 1
+
+# Message type sent by the server after the transfer with the results of the test
+MESSAGE_RESULT = 2
+
+# Message type sent by the client after a UDP transfer with the amount of datagrams it has sent
+MESSAGE_DONE = 3
+
+# Message type sent by the server when it has accepted the parameters of a test, and when it is ready to send back the UDP probes of the client
+MESSAGE_READY = 4
+
+# Message type sent by the server instead of MESSAGE_READY when it turns away a test, with the reason
+MESSAGE_ERROR = 5
+
+# Message type sent by the client of a bulk TCP stream when its streams start, so the server starts its clock and the warm-up of the '-O' flag at the same time
+MESSAGE_START = 6
+
+# Every UDP datagram starts with this header: the sequence number and the time it was sent in nanoseconds
+UDP_HEADER = struct.Struct("!QQ")
+
+# The largest payload of a UDP datagram over IPv4
+UDP_MAX_LENGTH = 65507
+
+# Socket option that lets the kernel split one large send into several datagrams (UDP GSO in Linux)
+UDP_SEGMENT = 103
+
+# The largest amount of datagrams that the kernel splits from a single send
+UDP_MAX_SEGMENTS = 64
+
+# How long the server waits for the datagrams that are still on their way when the client is done
+UDP_GRACE_TIME = 1.0
+
+# How long the UDP client sends datagrams before it checks the time again
+UDP_BATCH_TIME = 0.001
+
+# How many bytes a connection in the '-E' event loop receives at most in a single turn, before it gives the other connections a turn
+# Every busy connection takes a turn before a waiting connection is answered, so a turn of a full 128 KB buffer lets 50 busy streams delay a probe by tens of milliseconds
+EVENT_LOOP_TURN_BYTES = 64 * 1024
+
+# How long a TCP stream with the '--bitrate' flag sends in one batch before it checks the time again
+TCP_BATCH_TIME = 0.01
+
+# Socket option that lets the kernel space out the packets of a TCP stream at the given rate in bytes per second (Linux)
+SO_MAX_PACING_RATE = 47
+
+# The layout of the tcp_info structure of Linux up to the delivery rate, which is compiled once so every sample is a single unpack
+TCP_INFO_LAYOUT = struct.Struct("=8B24I4Q6IQ")
+
+# The position of the reported values in the tcp_info structure: snd_cwnd, rtt, rttvar, total_retrans, pacing_rate and delivery_rate
+TCP_INFO_CWND, TCP_INFO_RTT, TCP_INFO_RTTVAR, TCP_INFO_RETRANS, TCP_INFO_PACING_RATE, TCP_INFO_DELIVERY_RATE = 26, 23, 24, 31, 32, 42
+
+# The columns of the '--tcp-info' flag in the table
+TCP_INFO_HEADERS = ["Cwnd", "sRTT/RTTvar", "Retr", "Pacing", "Delivery"]
+
+# The columns of the '--self-stats' flag in the table
+SELF_STATS_HEADERS = ["Calls/s", "B/call", "CPU", "Blocked"]
+
+# The share of the time on a CPU core that marks a loop or a process of the '--self-stats' flag as CPU-bound
+SELF_STATS_CPU_BOUND = 0.9
+
+# The amount of bits of a value that the histogram of the round-trip times keeps, which bounds the error of a percentile to below 1/64
+HISTOGRAM_SUB_BITS = 7
+
+# The percentiles of the round-trip times that the '--rr' flag reports
+RR_PERCENTILES = [50, 90, 99, 99.9]
+
+# Time in seconds between two probes of the '--probe' flag, so the probe adds almost no load next to the bulk streams
+PROBE_INTERVAL = 0.01
+
+# How long the UDP probe waits for a probe to come back before it is counted as lost
+PROBE_TIMEOUT = 1.0
+
+# How long a stream waits for the other streams at the start, before it starts on its own
+START_TIMEOUT = 10.0
+
+# How often the main process of the '-w' flag checks if every process has printed its interval report, and the tick of a process that is done
+SUM_POLL_TIME = 0.001
+SUM_DONE = -1
+
+# The percentiles of the round-trip times of the '--probe' flag that are printed next to the throughput in the table
+PROBE_PERCENTILES = [50, 90, 99]
+
+# The columns of the '--csv' output, where a record leaves the columns that do not apply to it empty
+CSV_FIELDS = ["event", "role", "id", "timestamp", "start", "end", "bytes", "bits_per_second", "packets", "sent", "lost", "out_of_order", "jitter", "target_bits_per_second", "cwnd", "srtt", "rttvar", "retransmits", "pacing_rate", "delivery_rate", "calls", "calls_per_second", "bytes_per_call", "cpu_time", "blocked_time", "user_time", "system_time", "voluntary_switches", "involuntary_switches", "cpu_bound", "transactions", "transactions_per_second", "p50", "p90", "p99", "p99_9"]
+
+# The format of the output, which is a table, or line-delimited records from the '--json' or '--csv' flags
+output_mode = "table"
+
+# If the '--self-stats' flag is enabled, which adds the usage of simpleperf itself to the results
+self_stats = False
+
+# The ID of the test of this client, which every connection of the client sends, so the server counts them as a single test
+test_id = None
+
+# This function sets the output format and the '--self-stats' flag of this process, and the ID of the test of a client
+# The main process and every worker of the '-w' flag call it, since a worker only shares the globals of the main process when it is forked
+def apply_settings(args, test = None):
+    global output_mode, self_stats, test_id
+    output_mode = "json" if args.json else "csv" if args.csv else "table"
+    self_stats = args.self_stats
+    test_id = test
 
 # This function will parse the command-line arguments and perform basic error checking
 def parse_args():
@@ -31,13 +159,73 @@ def parse_args():
     parser.add_argument('-t', '--time', type = int, default = 25, help = "Selects a duration in seconds for which data should be generated")
 
     # '-i' flag: Sets the interval in seconds at which statistics should be printed
-    parser.add_argument('-i', '--interval', type = int, help = "Print statistics per specidied interval in seconds")
+    parser.add_argument('-i', '--interval', type = float, help = "Print statistics per specidied interval in seconds, down to 0.1")
+
+    # '-O' flag: Sets the warm-up in seconds at the start of the transfer, which is sent but left out of the results. The default value is 0
+    parser.add_argument('-O', '--omit', type = float, default = 0, help = "Omit the first seconds of the transfer from the results, such as TCP slow start")
 
     # '-n' flag: Sets the number of bytes that should be transferred by the client
     parser.add_argument('-n', '--num', type = str, help = "Transfer number of bytes (B/KB/MB)")
 
-    # '-P' flag: Sets the number between 1-5 of parallel connections to the server. The default value is 1
-    parser.add_argument('-P', '--parallel', type = int, default = 1, help = "Number of parallel connections to the server (1-5)")
+    # '-P' flag: Sets the number between 1-1000 of parallel connections to the server. The default value is 1
+    parser.add_argument('-P', '--parallel', type = int, default = 1, help = "Number of parallel connections to the server (1-1000)")
+
+    # '-l' flag: Sets the size of the buffer used for each send and receive call. The default value is 128KB, or 1470B for UDP
+    parser.add_argument('-l', '--length', type = str, help = "Size of the buffer used to send and receive (B/KB/MB)")
+
+    # '-Z' flag: Enables zero-copy sending, where the client sends from a file with sendfile() instead of a buffer
+    parser.add_argument('-Z', '--zerocopy', action = 'store_true', help = "Uses sendfile() to send the data without copying it")
+
+    # '-w' flag: Sets the number of processes that the parallel connections are spread across, or the number of server workers that share the port. The default value is 1
+    parser.add_argument('-w', '--processes', type = int, default = 1, help = "Number of processes that run the parallel connections, or of server workers that share the port with SO_REUSEPORT")
+
+    # '-A' flag: Pins every process to its own CPU core
+    parser.add_argument('-A', '--affinity', action = 'store_true', help = "Pins every process or server worker to a CPU core")
+
+    # '-u' flag: Enables UDP instead of TCP for the transfer
+    parser.add_argument('-u', '--udp', action = 'store_true', help = "Sends UDP datagrams instead of a TCP stream (client mode)")
+
+    # '--bitrate' flag: Sets the target bitrate of every stream in bits per second. The default value is 1M for UDP, while TCP is not limited
+    parser.add_argument('--bitrate', type = str, help = "Target bitrate of every stream in bits per second (K/M/G), e.g. 20M (client mode)")
+
+    # '--pacing' flag: Lets the kernel pace a TCP stream at the target bitrate instead of the client
+    parser.add_argument('--pacing', action = 'store_true', help = "Paces the TCP streams of '--bitrate' in the kernel with SO_MAX_PACING_RATE (client mode)")
+
+    # '-R' flag: Enables the reverse mode, where the server sends and the client receives
+    parser.add_argument('-R', '--reverse', action = 'store_true', help = "The server sends and the client receives (client mode)")
+
+    # '--bidir' flag: Enables the bidirectional mode, where both sides send and receive at the same time on every connection
+    parser.add_argument('--bidir', action = 'store_true', help = "Both sides send and receive at the same time on every connection (client mode)")
+
+    # '--rr' flag: Enables the request/response mode, where the client measures the round-trip time of every message. The default message size is 1B
+    parser.add_argument('--rr', type = str, nargs = '?', const = '1B', metavar = 'SIZE', help = "Measures the round-trip time of request/response messages of the given size (B/KB/MB), 1B by default (client mode)")
+
+    # '--probe' flag: Runs a probe of the round-trip time over TCP or UDP next to the bulk streams. The default protocol is TCP
+    parser.add_argument('--probe', type = str, nargs = '?', const = 'tcp', choices = ['tcp', 'udp'], help = "Measures the round-trip time with a TCP or UDP probe while the bulk streams run, TCP by default (client mode)")
+
+    # '--tcp-info' flag: Samples the state of every TCP connection in the kernel at every interval and at the end
+    parser.add_argument('--tcp-info', action = 'store_true', help = "Reports the congestion window, the round-trip time, the retransmits and the pacing and delivery rate of every stream from TCP_INFO (client mode)")
+
+    # '--self-stats' flag: Reports the calls, the CPU time and the blocked time of every loop, and the usage of the process
+    parser.add_argument('--self-stats', action = 'store_true', help = "Reports the send/recv calls, the CPU time and the time blocked in the kernel of every stream, and flags the runs where simpleperf was CPU-bound")
+
+    # '--json' flag: Prints every result as a line of JSON with the raw values instead of a table
+    parser.add_argument('--json', action = 'store_true', help = "Prints the results as line-delimited JSON records")
+
+    # '--csv' flag: Prints every result as a line of CSV with the raw values instead of a table
+    parser.add_argument('--csv', action = 'store_true', help = "Prints the results as CSV records")
+
+    # '-E' flag: Enables a server that handles every connection in a single event loop instead of a thread per connection
+    parser.add_argument('-E', '--event-loop', action = 'store_true', help = "Handles all connections in one asyncio event loop (server mode)")
+
+    # '--backlog' flag: Sets the amount of connections that the kernel queues before the server accepts them. The default value is SOMAXCONN
+    parser.add_argument('--backlog', type = int, default = SOMAXCONN, help = "Length of the queue of connections that are not accepted yet (server mode)")
+
+    # '--max-tests' flag: Sets the amount of connections that the server handles at the same time, where the rest wait in the backlog
+    parser.add_argument('--max-tests', type = int, help = "Number of test connections that are handled at the same time (server mode)")
+
+    # '--one-off' flag: Enables a server that exits when the connections of the first client are done
+    parser.add_argument('--one-off', action = 'store_true', help = "Handles the connections of a single client and exits (server mode)")
 
     # Parsing the command-line arguments
     args = parser.parse_args()
@@ -50,6 +238,10 @@ def parse_args():
 
 # This function will validate the arguments from above
 def validate_args(args):
+    # If the '-l' flag is not set, a datagram must fit in a single packet for UDP, while TCP uses a large buffer
+    if args.length is None:
+        args.length = "1470B" if args.udp else "128KB"
+
     # Checks if both '-s' flag and '-c' flag are enabled at the same time
     if args.server and args.client:
         sys.exit("Error: You cannot run both server and client mode at the same time")
@@ -82,17 +274,111 @@ def validate_args(args):
     if args.time is not None and args.time < 1:
         sys.exit("Error: Invalid value for '-t' flag. Duration in seconds must be a positive integer")
     
-    # Checks if the value for the '-i' flag is a positive integer
-    if args.interval is not None and args.interval < 1:
-        sys.exit("Error: Invalid value for '-i' flag. Duration in seconds must be a positive integer")
+    # Checks if the value for the '-i' flag is at least a tenth of a second, which is the precision of the interval in the table
+    if args.interval is not None and args.interval < 0.1:
+        sys.exit("Error: Invalid value for '-i' flag. Duration in seconds must be at least 0.1")
+
+    # Checks if the value for the '-O' flag is not negative
+    if args.omit < 0:
+        sys.exit("Error: Invalid value for '-O' flag. Duration in seconds must not be negative")
+
+    # The warm-up of the '-O' flag comes before the duration of the '-t' flag, and is left out of the bytes and the round-trip times of a bulk TCP stream
+    if args.omit and (args.num is not None or args.udp or args.rr is not None):
+        sys.exit("Error: The '-O' flag cannot be used with the '-n' flag, the '-u' flag or the '--rr' flag")
 
     # Checks if the format for the '-n' is correct
     if args.num is not None and (args.num[-2:] not in ["KB", "MB"] and args.num[-1:] != "B"):
         sys.exit("Error: Invalid value for '-n' flag. Format must be an integer followed by either B, KB, or MB")
 
-    # Checks if the value for the '-P' flag is between 1 and 5
-    if args.parallel < 1 or args.parallel > 5:
-        sys.exit("Error: Invalid value for '-P' flag. Number of parallel connections must be a integer between 1 and 5")
+    # Checks if the value for the '-P' flag is between 1 and 1000
+    if args.parallel < 1 or args.parallel > 1000:
+        sys.exit("Error: Invalid value for '-P' flag. Number of parallel connections must be a integer between 1 and 1000")
+
+    # Checks if the format for the '-l' flag is correct and the buffer holds at least one byte
+    if (args.length[-2:] not in ["KB", "MB"] and args.length[-1:] != "B") or not args.length.rstrip("KMB").isdigit() or format_num(args.length) < 1:
+        sys.exit("Error: Invalid value for '-l' flag. Format must be a positive integer followed by either B, KB, or MB")
+
+    # Checks if the value for the '-w' flag is between 1 and the number of parallel connections, where a server may have any amount of workers
+    if args.processes < 1 or (args.client and args.processes > args.parallel):
+        sys.exit("Error: Invalid value for '-w' flag. Number of processes must be a integer between 1 and the value of the '-P' flag")
+
+    # Checks if the value for the '--backlog' flag and the '--max-tests' flag are positive integers
+    if args.backlog < 1:
+        sys.exit("Error: Invalid value for '--backlog' flag. The length of the queue must be a positive integer")
+    if args.max_tests is not None and args.max_tests < 1:
+        sys.exit("Error: Invalid value for '--max-tests' flag. The number of tests must be a positive integer")
+
+    # The '--one-off' flag waits for the connections of a single client, which every worker would see only a share of
+    if args.one_off and args.processes > 1:
+        sys.exit("Error: The '--one-off' flag cannot be used with the '-w' flag")
+
+    # The workers of the '-w' flag share the port with SO_REUSEPORT, which Linux and the BSDs support
+    if args.server and args.processes > 1 and "SO_REUSEPORT" not in globals():
+        sys.exit("Error: The '-w' flag in server mode is not supported on this platform")
+
+    # The default value of the '--bitrate' flag is 1M for UDP, while a TCP stream is not limited
+    if args.udp and args.bitrate is None:
+        args.bitrate = "1M"
+
+    # The '--pacing' flag lets the kernel pace a TCP stream at the rate of the '--bitrate' flag
+    if args.pacing and (args.bitrate is None or args.udp):
+        sys.exit("Error: The '--pacing' flag requires the '--bitrate' flag, and cannot be used with the '-u' flag")
+
+    # Checks if the format for the '--bitrate' flag is a positive number followed by an optional unit
+    # The number is parsed as a float, which also takes 'inf' and 'nan', and neither can be turned into the batches or the pacing rate of a stream
+    if args.bitrate is not None:
+        try:
+            bitrate = format_bitrate(args.bitrate)
+        except ValueError:
+            bitrate = 0
+        if not math.isfinite(bitrate) or bitrate <= 0:
+            sys.exit("Error: Invalid value for '--bitrate' flag. Format must be a positive number followed by either K, M, or G")
+
+    # Checks if a datagram for the '-u' flag holds the header and fits in a UDP packet
+    if args.udp and not UDP_HEADER.size <= format_num(args.length) <= UDP_MAX_LENGTH:
+        sys.exit(f"Error: Invalid value for '-l' flag. The size of a UDP datagram must be between {UDP_HEADER.size}B and {UDP_MAX_LENGTH}B")
+
+    # The '-Z' flag sends from a file, which only a TCP stream supports
+    if args.udp and args.zerocopy:
+        sys.exit("Error: The '-Z' flag cannot be used with the '-u' flag")
+
+    # Checks if both '-R' flag and '--bidir' flag are enabled at the same time
+    if args.reverse and args.bidir:
+        sys.exit("Error: You cannot use both the '-R' flag and the '--bidir' flag at the same time")
+
+    # The '-R' flag and the '--bidir' flag send a TCP stream in the other direction as well
+    if (args.reverse or args.bidir) and (args.udp or args.rr is not None):
+        sys.exit("Error: The '-R' flag and the '--bidir' flag cannot be used with the '-u' flag or the '--rr' flag")
+
+    # Checks if the format for the '--rr' flag is correct and the message holds at least one byte
+    if args.rr is not None and ((args.rr[-2:] not in ["KB", "MB"] and args.rr[-1:] != "B") or not args.rr.rstrip("KMB").isdigit() or format_num(args.rr) < 1):
+        sys.exit("Error: Invalid value for '--rr' flag. Format must be a positive integer followed by either B, KB, or MB")
+
+    # The '--rr' flag sends messages over a TCP stream, one at a time
+    if args.rr is not None and (args.udp or args.zerocopy or args.bitrate is not None):
+        sys.exit("Error: The '--rr' flag cannot be used with the '-u' flag, the '-Z' flag or the '--bitrate' flag")
+
+    # The '--probe' flag runs next to the TCP bulk streams in this process, and its columns follow the columns of the TCP table
+    if args.probe is not None and (args.rr is not None or args.udp or args.processes > 1):
+        sys.exit("Error: The '--probe' flag cannot be used with the '--rr' flag, the '-u' flag or the '-w' flag")
+
+    # The '--tcp-info' flag reads the state of a TCP stream that sends or receives bulk data
+    if args.tcp_info and (args.udp or args.rr is not None):
+        sys.exit("Error: The '--tcp-info' flag cannot be used with the '-u' flag or the '--rr' flag")
+
+    # The '--self-stats' flag counts the calls of the TCP loops, and reads the usage of the process with getrusage()
+    if args.self_stats and (args.udp or args.rr is not None):
+        sys.exit("Error: The '--self-stats' flag cannot be used with the '-u' flag or the '--rr' flag")
+    if args.self_stats and resource is None:
+        sys.exit("Error: The '--self-stats' flag is not supported on this platform")
+
+    # Checks if both '--json' flag and '--csv' flag are enabled at the same time
+    if args.json and args.csv:
+        sys.exit("Error: You cannot use both the '--json' flag and the '--csv' flag at the same time")
+
+    # Checks if the platform can pin a process to a CPU core for the '-A' flag
+    if args.affinity and not hasattr(os, "sched_setaffinity"):
+        sys.exit("Error: The '-A' flag is not supported on this platform")
 
 # This function convert a given value to the specified format
 def format_values(value, input_format):
@@ -118,68 +404,1399 @@ def format_num(input_num):
     elif input_num[-1:] == "B":
         return int(input_num[:-1])
     
+# This function will convert the string from the '--bitrate' flag to bits per second
+def format_bitrate(input_bitrate):
+    # The units of the bitrate, where every unit is a thousand of the previous one
+    units = {"K": 1e3, "M": 1e6, "G": 1e9}
+
+    # If the string ends with a unit, the number is multiplied by the unit
+    if input_bitrate[-1:] in units:
+        return float(input_bitrate[:-1]) * units[input_bitrate[-1:]]
+
+    # Otherwise the string is the bitrate in bits per second
+    return float(input_bitrate)
+
 # This function will print the given data in a formatted table row
 def print_table(data):
     # The format of the row
     format_row = "{:>20}" * (len(data))
 
-    # Prints out the data element in a single row
-    print(format_row.format(*data))
+    # Prints out the data element in a single row, written in one call so rows from parallel streams do not mix
+    sys.stdout.write(format_row.format(*data) + "\n")
+
+# This function prints the headers of a table, which are left out of the '--json' and '--csv' output
+def print_headers(headers):
+    if output_mode == "table":
+        print_table(headers)
+
+# This function prints a message, which goes to the standard error with the '--json' and '--csv' flags so the output only holds records
+def print_message(message):
+    print(message, file = sys.stdout if output_mode == "table" else sys.stderr)
+
+# This function prints a result, either as a row of the table or as a record with the raw values
+def print_result(event, role, name, start, end, total_bytes, input_format, columns = (), target = None, **fields):
+    # Calculates the rate in megabites per second, where the start and the end of the interval are in nanoseconds
+    rate = (total_bytes * 8e3) / (end - start) if end > start else 0.0
+
+    # Printing the values in a table format, with the rate as a share of the target bitrate of the '--bitrate' flag and any additional columns
+    if output_mode == "table":
+        print_table([name, f"{start / 1e9:.1f} - {end / 1e9:.1f}", f"{format_values(total_bytes, input_format):.2f} {input_format}", f"{rate:.2f} Mbps"] + ([f"{rate * 1e6 / target:.1%}"] if target else []) + list(columns))
+        return
+
+    # The target bitrate is part of the record when it is given
+    if target:
+        fields["target_bits_per_second"] = target
+
+    # Printing the record with the full precision of every value
+    print_record({"event": event, "role": role, "id": name, "timestamp": time.time_ns(), "start": start, "end": end, "bytes": total_bytes, "bits_per_second": rate * 1e6, **fields})
+
+# This function prints the round-trip times of request/response transactions, either as a row of the table or as a record with the raw values
+def print_rr_result(event, role, name, start, end, histogram):
+    # Calculates the rate in transactions per second, where the start and the end of the interval are in nanoseconds
+    rate = histogram.count * 1e9 / (end - start) if end > start else 0.0
+
+    # The percentiles of the round-trip times in nanoseconds
+    percentiles = [histogram.percentile(percentile) for percentile in RR_PERCENTILES]
 
-# This function handles the packages in the server, where it will receives from the client
-def handle_server(client_socket, client_address, input_format):
+    # Printing the values in a table format, where the round-trip times are in milliseconds
+    if output_mode == "table":
+        print_table([name, f"{start / 1e9:.1f} - {end / 1e9:.1f}", histogram.count, f"{rate:.1f} tps"] + [format_rtt(value) for value in percentiles])
+        return
+
+    # Printing the record with the full precision of every value
+    print_record({"event": event, "role": role, "id": name, "timestamp": time.time_ns(), "start": start, "end": end, "transactions": histogram.count, "transactions_per_second": rate, **{f"p{percentile:g}".replace(".", "_"): value for percentile, value in zip(RR_PERCENTILES, percentiles)}})
+
+# This function formats a round-trip time in nanoseconds as milliseconds in the table
+def format_rtt(value):
+    return f"{value / 1e6:.3f} ms" if value is not None else "-"
+
+# This function returns the columns with the round-trip times of the '--probe' flag in the table
+def probe_columns(histogram):
+    return [format_rtt(histogram.percentile(percentile)) for percentile in PROBE_PERCENTILES]
+
+# This function returns the columns of the '--tcp-info' flag in a sum, where only the retransmits add up across the streams
+def tcp_info_sum_columns(retransmits = None):
+    return ["-", "-", retransmits if retransmits is not None else "-", "-", "-"]
+
+# This function reads the state of a TCP connection from the kernel, or returns None if the socket is closed or the platform has no TCP_INFO
+def read_tcp_info(connection_socket):
+    # Reads the tcp_info structure with a single call
+    try:
+        data = connection_socket.getsockopt(IPPROTO_TCP, TCP_INFO, TCP_INFO_LAYOUT.size)
+    except (OSError, NameError):
+        return None
+
+    # An older kernel returns a shorter structure, where the missing values are left as zero
+    values = TCP_INFO_LAYOUT.unpack(data.ljust(TCP_INFO_LAYOUT.size, b"\0"))
+
+    # The round-trip times are converted from microseconds to nanoseconds, and the rates from bytes to bits per second
+    return {"cwnd": values[TCP_INFO_CWND], "srtt": values[TCP_INFO_RTT] * 1000, "rttvar": values[TCP_INFO_RTTVAR] * 1000, "retransmits": values[TCP_INFO_RETRANS], "pacing_rate": values[TCP_INFO_PACING_RATE] * 8, "delivery_rate": values[TCP_INFO_DELIVERY_RATE] * 8}
+
+# This function samples the state of the connection of a stream, and returns the columns in the table and the fields of the record
+# The retransmits are counted since the last sample of an interval report, or since the start for the whole transfer
+def tcp_info_report(stream, interval = True):
+    # A closed connection has no state to report
+    info = read_tcp_info(stream.socket)
+    if info is None:
+        return ["-"] * len(TCP_INFO_HEADERS), {}
+
+    # The kernel counts the retransmits of the whole connection, where the ones of the warm-up of the '-O' flag are left out
+    total_retransmits = info["retransmits"]
+    if interval:
+        info["retransmits"] -= stream.reported_retransmits
+        stream.reported_retransmits = total_retransmits
+    else:
+        info["retransmits"] -= stream.omitted_retransmits
+
+    # Printing the congestion window in segments, the smoothed round-trip time and its variation, and the rates in megabits per second
+    columns = [info["cwnd"], f"{info['srtt'] / 1e6:.2f}/{info['rttvar'] / 1e6:.2f} ms", info["retransmits"], f"{info['pacing_rate'] / 1e6:.2f} Mbps", f"{info['delivery_rate'] / 1e6:.2f} Mbps"]
+
+    # Returns the columns and the fields
+    return columns, info
+
+# This function returns the columns of the '--self-stats' flag in the table and the fields of the record, for the calls and the bytes of a loop in the given time in nanoseconds
+# The loop is either on the CPU or blocked in the kernel, so the time that it was not on the CPU is the time that it waited for the socket
+def self_stats_report(calls, total_bytes, duration, cpu_time = None):
+    # The calls per second, and the bytes that every call has sent or received
+    calls_per_second = calls * 1e9 / duration if duration > 0 else 0.0
+    bytes_per_call = total_bytes / calls if calls else 0.0
+    columns = [f"{calls_per_second:.0f}", f"{bytes_per_call:.0f} B"]
+    fields = {"calls": calls, "calls_per_second": calls_per_second, "bytes_per_call": bytes_per_call}
+
+    # The CPU time is only known for the whole transfer of a loop in a thread of its own
+    if cpu_time is None or duration <= 0:
+        return columns + ["-", "-"], fields
+
+    # The share of the time the loop was on the CPU and blocked
+    blocked_time = max(duration - cpu_time, 0)
+    fields.update(cpu_time = cpu_time, blocked_time = blocked_time)
+    return columns + [f"{cpu_time / duration:.0%}", f"{blocked_time / duration:.0%}"], fields
+
+# This function adds the columns and the fields of the '--self-stats' flag for the whole transfer of a stream, and warns if the loop was CPU-bound
+def add_self_stats(stream, columns, fields):
+    # Without the '--self-stats' flag, nothing is added
+    if not self_stats:
+        return columns, fields
+
+    # The loop runs from the start of the stream until its last call, where the warm-up of the '-O' flag is left out
+    duration = stream.end_time - stream.start
+    self_columns, self_fields = self_stats_report(stream.calls - stream.omitted_calls, stream.measured_bytes(), duration, stream.cpu_time)
+
+    # A loop that was on the CPU almost all the time could not have sent or received faster, whatever the network can carry
+    if stream.cpu_time is not None and duration > 0 and stream.cpu_time / duration >= SELF_STATS_CPU_BOUND:
+        print_message(f"Warning: {stream.name}: The loop was on the CPU {stream.cpu_time / duration:.0%} of the time, so the rate is limited by simpleperf rather than the network")
+
+    # Returns the columns and the fields with the ones of the '--self-stats' flag
+    return list(columns) + self_columns, {**fields, **self_fields}
+
+# This function reads the usage of this process and of the processes it has waited for, for the '--self-stats' flag
+def read_usage():
+    return time.monotonic_ns(), resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+
+# This function prints the usage of the processes since the given usage, and flags a run where simpleperf was CPU-bound
+# Every process runs its Python code on a single core at a time, so the processes are CPU-bound when they have used almost a core each
+def print_self_stats(role, start_usage, processes):
+    # The wall time, and the usage of this process and of the worker processes together
+    end_usage = read_usage()
+    duration = end_usage[0] - start_usage[0]
+    user_time = sum(int((end.ru_utime - start.ru_utime) * 1e9) for start, end in zip(start_usage[1:], end_usage[1:]))
+    system_time = sum(int((end.ru_stime - start.ru_stime) * 1e9) for start, end in zip(start_usage[1:], end_usage[1:]))
+    voluntary_switches = sum(end.ru_nvcsw - start.ru_nvcsw for start, end in zip(start_usage[1:], end_usage[1:]))
+    involuntary_switches = sum(end.ru_nivcsw - start.ru_nivcsw for start, end in zip(start_usage[1:], end_usage[1:]))
+
+    # The share of the cores that the processes could use
+    share = (user_time + system_time) / (duration * processes) if duration > 0 else 0.0
+    cpu_bound = share >= SELF_STATS_CPU_BOUND
+
+    # Printing the usage as a message in a table format, or as a record with the raw values
+    if output_mode == "table":
+        print_message(f"Self-stats: {user_time / 1e9:.2f} s user, {system_time / 1e9:.2f} s system, {share:.0%} of {processes} {'core' if processes == 1 else 'cores'}, {voluntary_switches} voluntary and {involuntary_switches} involuntary context switches")
+        if cpu_bound:
+            print_message("Warning: simpleperf was CPU-bound, so the results may be limited by simpleperf rather than the network")
+    else:
+        print_record({"event": "self_stats", "role": role, "timestamp": time.time_ns(), "start": 0, "end": duration, "cpu_time": user_time + system_time, "user_time": user_time, "system_time": system_time, "voluntary_switches": voluntary_switches, "involuntary_switches": involuntary_switches, "cpu_bound": cpu_bound})
+
+# This function prints a record as a line of JSON or CSV
+def print_record(record):
+    if output_mode == "json":
+        sys.stdout.write(json.dumps(record) + "\n")
+    else:
+        print_csv([record.get(field, "") for field in CSV_FIELDS])
+
+# This function prints a line of CSV, written in one call so lines from parallel streams do not mix
+def print_csv(values):
+    # The csv module writes the line into a string, which is then written at once
+    line = io.StringIO()
+    csv.writer(line).writerow(values)
+    sys.stdout.write(line.getvalue())
+
+# This function receives exactly the given amount of bytes from the socket
+def recv_exact(connection_socket, length):
+    # Preallocating the buffer for the bytes
+    buffer = bytearray(length)
+
+    # A view of the buffer, so the bytes can be received into the remaining part of it
+    view = memoryview(buffer)
+
+    # Amount of bytes that has been received so far
+    received = 0
+
+    # Continues until the buffer is filled
+    while received < length:
+        # Receiving the bytes into the remaining part of the buffer
+        received_bytes = connection_socket.recv_into(view[received:])
+
+        # If the connection is closed before every byte has arrived
+        if received_bytes == 0:
+            raise ConnectionError("Connection closed in the middle of a control message")
+
+        # Updates the amount of received bytes
+        received += received_bytes
+
+    # Returns the received bytes
+    return bytes(buffer)
+
+# This function encodes a control message with the given type and payload
+def encode_message(message_type, payload):
+    # Encoding the payload, which is only done when the test starts and ends
+    encoded_payload = json.dumps(payload).encode()
+
+    # Returns the header followed by the payload
+    return CONTROL_HEADER.pack(CONTROL_MAGIC, message_type, len(encoded_payload)) + encoded_payload
+
+# This function unpacks the header of a control message and returns the type and the length of the payload
+def decode_header(header):
+    # Unpacking the header of the message
+    magic, message_type, length = CONTROL_HEADER.unpack(header)
+
+    # If the message does not start with the magic value, the other side is not simpleperf
+    if magic != CONTROL_MAGIC:
+        raise ConnectionError("Received an invalid control message")
+
+    # Returns the type and the length of the payload
+    return message_type, length
+
+# This function sends a control message with the given type and payload
+def send_message(connection_socket, message_type, payload):
+    # Sends the header and the payload in a single call
+    connection_socket.sendall(encode_message(message_type, payload))
+
+# This function receives a control message and returns the type and the payload
+def recv_message(connection_socket):
+    # Receiving and unpacking the header of the message
+    message_type, length = decode_header(recv_exact(connection_socket, CONTROL_HEADER.size))
+
+    # Receiving and decoding the payload of the message
+    payload = json.loads(recv_exact(connection_socket, length))
+
+    # Returns the type and the payload of the message
+    return message_type, payload
+
+# This function checks if the first message from a client holds parameters of the same protocol version, and that the server has room for the test
+# Returns the reason that the test is turned away, or None if the test is accepted
+def check_params(client_address, message_type, params, udp_enabled = True, slots = None):
+    # Checks if the client speaks the same version of the control protocol
+    if message_type != MESSAGE_PARAMS or params.get("version") != CONTROL_VERSION:
+        return f"Unsupported control message, the server speaks version {CONTROL_VERSION} of the control protocol"
+
+    # The workers of the '-w' flag only share the TCP port, so the datagrams of a UDP test could arrive at another worker than its connection
+    if not udp_enabled and (params.get("udp") or params.get("udp_probe")):
+        return "UDP tests require a server with a single worker"
+
+    # With the '--max-tests' flag, the connection takes a place for its test, unless the test already has one
+    if slots is not None and not slots.acquire(client_address, params.get("test")):
+        return f"The server is already running the most tests it allows at the same time ({slots.max_tests}), try again later"
+
+    # The parameters are valid
+    return None
+
+# This function sends the parameters of a test to the server, and waits until the server has accepted them
+# Raises a ConnectionError with the reason that the server has given if it turns away the test
+def start_test(client_socket, params):
+    # Every connection of this client sends the same ID of the test
+    send_message(client_socket, MESSAGE_PARAMS, {"version": CONTROL_VERSION, "test": test_id, **params})
+
+    # Waiting for the answer of the server
+    message_type, reply = recv_message(client_socket)
+    if message_type == MESSAGE_ERROR:
+        raise ConnectionError(f"The server has turned away the test: {reply.get('error')}")
+    if message_type != MESSAGE_READY:
+        raise ConnectionError("Received an unexpected control message")
+
+# The tests that the server handles at the same time with the '--max-tests' flag, where every connection of a client counts toward a single test
+# The connections of a client from before the ID of the test, or of a benchmark without one, are each a test of their own
+class TestSlots:
+    def __init__(self, max_tests):
+        self.max_tests = max_tests
+
+        # The amount of connections of every running test, and the test of every connection
+        self.tests = {}
+        self.connections = {}
+
+        # The threads of the server take and free the places at the same time
+        self.lock = threading.Lock()
+
+    # This function takes a place for the test of a connection, and returns False if every place is taken by other tests
+    def acquire(self, client_address, test):
+        test = test or client_address
+        with self.lock:
+            if test not in self.tests and len(self.tests) >= self.max_tests:
+                return False
+            self.tests[test] = self.tests.get(test, 0) + 1
+            self.connections[client_address] = test
+            return True
+
+    # This function frees the place of a connection, where a test frees its place when its last connection is done
+    def release(self, client_address):
+        with self.lock:
+            test = self.connections.pop(client_address, None)
+            if test is None:
+                return
+            self.tests[test] -= 1
+            if self.tests[test] == 0:
+                del self.tests[test]
+
+# This function prints the results of a transfer that the server has received or sent, where the duration is in nanoseconds
+def print_server_result(stream, total_bytes, duration, input_format, header = "Received"):
+    # Defining the headers of the table, with the usage of the loop if the '--self-stats' flag is enabled
+    headers = ["ID", "Interval", header, "Rate"] + (SELF_STATS_HEADERS if self_stats else [])
+    columns, fields = add_self_stats(stream, [], {})
+    
+    # Printing the values in a table format
+    print_headers(headers)
+    print_result("stream", "server", stream.name, 0, duration, total_bytes, input_format, columns, **fields)
+
+# The state of a transfer, where the sending or receiving loop only updates the counter and the interval reports read it
+class Stream:
+    def __init__(self, name, direction = None):
+        # The ID of the stream in the table, followed by the direction for the '-R' flag and the '--bidir' flag
+        self.name = f"{name} {direction}" if direction else name
+
+        # The direction of the stream, which is either TX or RX when both sides send
+        self.direction = direction
+
+        # The target bitrate of the stream in bits per second with the '--bitrate' flag
+        self.target = None
+
+        # Amount of sent or received bytes, which is the only value that the loop updates
+        self.bytes = 0
+
+        # The sending loop continues as long as this is set, and the timer clears it when the duration has passed
+        self.running = True
+
+        # Time in nanoseconds at when the stream started
+        self.start = time.monotonic_ns()
+
+        # Amount of bytes and the time at the last interval report
+        self.reported_bytes = 0
+        self.reported_time = self.start
+
+        # Time in nanoseconds at when the stream ended, for a stream that ends before its results are printed
+        self.end_time = self.start
+
+        # The socket of the stream that the '--tcp-info' flag samples, and the retransmits at the last interval report
+        self.socket = None
+        self.reported_retransmits = 0
+
+        # Amount of send or receive calls and the amount at the last interval report, which the loop counts next to the bytes
+        self.calls = 0
+        self.reported_calls = 0
+
+        # CPU time in nanoseconds of the thread that runs the loop, at the start and for the whole transfer
+        # A loop in the event loop shares its thread with every other connection, so its CPU time is not known
+        self.cpu_start = time.thread_time_ns()
+        self.cpu_time = None
+
+        # The thread that runs the loop, whose CPU time is read when the warm-up ends
+        self.thread = threading.get_ident()
+
+        # The start that the stream shares with the other streams of the client, if any
+        self.clock = None
+
+        # Amount of bytes, calls and retransmits during the warm-up of the '-O' flag, which are left out of the results
+        self.omitted_bytes = 0
+        self.omitted_calls = 0
+        self.omitted_retransmits = 0
+
+    # This function restarts the clock of the stream, right before the transfer starts, at the same time as the other streams of the client
+    def start_clock(self):
+        self.start = self.clock.wait() if self.clock is not None else time.monotonic_ns()
+        self.reported_time = self.start
+        self.thread = threading.get_ident()
+        self.cpu_start = time.thread_time_ns()
+
+    # This function ends the warm-up of the '-O' flag at the given time, from another thread than the loop
+    # The counters are not reset, since the loop may update them at any time, so the values at the end of the warm-up are subtracted instead
+    def omit(self, now):
+        # Reading the counters once, and making the end of the warm-up the last interval report
+        self.omitted_bytes = self.reported_bytes = self.bytes
+        self.omitted_calls = self.reported_calls = self.calls
+        self.start = self.reported_time = now
+
+        # With the '--tcp-info' flag, the retransmits of the warm-up are left out as well
+        if self.socket is not None:
+            info = read_tcp_info(self.socket)
+            if info is not None:
+                self.omitted_retransmits = self.reported_retransmits = info["retransmits"]
+
+        # With the '--self-stats' flag, the CPU time of the loop is read from the clock of its thread
+        if self_stats:
+            try:
+                self.cpu_start = time.clock_gettime_ns(time.pthread_getcpuclockid(self.thread))
+            except (AttributeError, OSError):
+                pass
+
+    # This function returns the bytes of the stream after the warm-up of the '-O' flag
+    def measured_bytes(self):
+        return self.bytes - self.omitted_bytes
+
+    # This function stops the clock of the stream, right after the transfer, in the thread that has run the loop
+    def stop_clock(self):
+        self.end_time = time.monotonic_ns()
+        self.cpu_time = time.thread_time_ns() - self.cpu_start
+
+# The start of the transfer that every stream and every timer of the client waits for, so the streams start at the same time and the interval reports line up
+# The barrier is shared by the threads of this process, or by the threads of every process of the '-w' flag, and the time is in shared memory
+class StartClock:
+    def __init__(self, barrier):
+        self.barrier = barrier
+        self.time = multiprocessing.RawValue("q", 0)
+
+    # This function waits until every stream and timer is ready, and returns the time in nanoseconds that they start at
+    def wait(self):
+        try:
+            # The first one to pass the barrier sets the time, and the second barrier lets every other one read it
+            if self.barrier.wait(START_TIMEOUT) == 0:
+                self.time.value = time.monotonic_ns()
+            self.barrier.wait(START_TIMEOUT)
+            return self.time.value
+        except threading.BrokenBarrierError:
+            # If a stream has failed before the start, the others start on their own instead of waiting for it
+            return time.monotonic_ns()
+
+# The bytes of the streams of every process of the '-w' flag at its last interval report, which the main process adds up to the sum of the interval
+# Every process only writes its own counters, and the tick of the report after the bytes, so the counters need no lock
+class SharedSums:
+    def __init__(self, processes, directions):
+        # The directions of the streams, where every process has a counter for every direction
+        self.directions = directions
+
+        # The bytes of every process in every direction, and the tick of the last report of every process
+        self.bytes = multiprocessing.RawArray("q", processes * len(directions))
+        self.ticks = multiprocessing.RawArray("q", processes)
+
+    # This function writes the bytes of the streams of a process at the report of the given tick
+    def publish(self, process, streams, tick):
+        for index, direction in enumerate(self.directions):
+            self.bytes[process * len(self.directions) + index] = sum(stream.measured_bytes() for stream in streams if stream.direction == direction)
+        self.ticks[process] = tick
+
+    # This function marks a process as done, so the main process no longer waits for its reports
+    def finish(self, process):
+        self.ticks[process] = SUM_DONE
+
+    # This function returns the bytes of every process together in the given direction
+    def total(self, index):
+        return sum(self.bytes[process * len(self.directions) + index] for process in range(len(self.ticks)))
+
+# A histogram of values with bounded memory, where every power of two is split into buckets of the same relative width (as in HdrHistogram)
+class Histogram:
+    def __init__(self, counts = None):
+        # The amount of values in every bucket, where only the buckets that hold a value are stored
+        self.counts = {} if counts is None else counts
+
+    # This function adds a value to the histogram
+    def record(self, value):
+        # Small values have a bucket of their own
+        if value < (1 << HISTOGRAM_SUB_BITS):
+            index = value
+        # Larger values keep their highest bits, and the buckets after them are counted by the amount of bits dropped
+        else:
+            shift = value.bit_length() - HISTOGRAM_SUB_BITS
+            index = (shift << (HISTOGRAM_SUB_BITS - 1)) + (value >> shift)
+
+        # Updates the amount of values in the bucket
+        self.counts[index] = self.counts.get(index, 0) + 1
+
+    # This function adds every value of another histogram to this one
+    def add(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+
+    # The amount of values in the histogram
+    @property
+    def count(self):
+        return sum(self.counts.values())
+
+    # This function returns the value at the given percentile, or None if the histogram is empty
+    def percentile(self, percentile):
+        # The rank of the value in the sorted values, where the first value has the rank 1
+        rank = max(1, -(-self.count * percentile // 100))
+
+        # Iterate for each bucket from the smallest values, until the bucket that holds the value of the rank
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                # Small values have a bucket of their own
+                if index < (1 << HISTOGRAM_SUB_BITS):
+                    return index
+
+                # Otherwise the highest value of the bucket is returned
+                shift = (index >> (HISTOGRAM_SUB_BITS - 1)) - 1
+                return ((index - (shift << (HISTOGRAM_SUB_BITS - 1)) + 1) << shift) - 1
+
+        # The histogram is empty
+        return None
+
+# The state of a request/response transfer in the client, where every round-trip time is recorded in a histogram
+class RttStream(Stream):
+    def __init__(self, name):
+        super().__init__(name)
+
+        # The round-trip time of every transaction in nanoseconds
+        self.histogram = Histogram()
+
+        # A copy of the counts of the histogram at the last interval report
+        self.reported_counts = {}
+
+    # This function returns the histogram of the round-trip times since the last interval report, and makes this the last report
+    def report_histogram(self):
+        # Copying the counts once, since the transaction loop may record a value at any time
+        counts = self.histogram.counts.copy()
+
+        # Round-trip times since the last report
+        histogram = Histogram({index: count - self.reported_counts.get(index, 0) for index, count in counts.items() if count > self.reported_counts.get(index, 0)})
+
+        # Updates the counts of the last report
+        self.reported_counts = counts
+
+        # Returns the round-trip times
+        return histogram
+
+    # This function ends the warm-up of the '-O' flag, where the round-trip times of the warm-up are left out by starting a new histogram
+    def omit(self, now):
+        super().omit(now)
+        self.histogram = Histogram()
+        self.reported_counts = {}
+
+# The state of a UDP transfer that the server is receiving, updated for every datagram
+class UdpStream(Stream):
+    def __init__(self, name):
+        super().__init__(name)
+
+        # Amount of received datagrams
+        self.packets = 0
+
+        # The highest sequence number so far, and the amount of datagrams that arrived after a higher one
+        self.max_sequence = -1
+        self.out_of_order = 0
+
+        # The interarrival jitter from RFC 3550 in nanoseconds, and the transit time of the last datagram
+        self.jitter = 0.0
+        self.last_transit = None
+
+# This function receives every UDP datagram to the server and updates the state of the transfer it belongs to
+def handle_udp_server(udp_socket, udp_streams, udp_probes):
+    # Preallocating a buffer that holds the largest datagram
+    buffer = bytearray(UDP_MAX_LENGTH)
+
+    # Continues to receive datagrams as long as the server runs
+    while True:
+        # Receiving the datagram directly into the buffer
+        received_bytes, client_address = udp_socket.recvfrom_into(buffer)
+
+        # Time at when the datagram was received
+        receive_time = time.monotonic_ns()
+
+        # Datagrams that are too short to hold the header are not from simpleperf
+        if received_bytes < UDP_HEADER.size:
+            continue
+
+        # Probes of the '--probe' flag are sent back to the client as they are
+        if client_address in udp_probes:
+            udp_socket.sendto(buffer[:received_bytes], client_address)
+            continue
+
+        # The state of the transfer, which the control connection registers before the first datagram and removes when the client is done
+        # Datagrams from any other address, such as the late datagrams of a transfer that is done, are dropped
+        stream = udp_streams.get(client_address)
+        if stream is None:
+            continue
+
+        # The transfer starts at the first datagram
+        if stream.packets == 0:
+            stream.start = stream.reported_time = receive_time
+
+        # Unpacking the sequence number and the time the datagram was sent
+        sequence, send_time = UDP_HEADER.unpack_from(buffer)
+
+        # Updates the amount of received datagrams and bytes, where the end of the stream is the last datagram
+        stream.packets += 1
+        stream.bytes += received_bytes
+        stream.end_time = receive_time
+
+        # A datagram with a lower sequence number than one already received has been reordered
+        if sequence > stream.max_sequence:
+            stream.max_sequence = sequence
+        else:
+            stream.out_of_order += 1
+
+        # Updates the interarrival jitter with the difference in transit time from the last datagram (RFC 3550)
+        transit = receive_time - send_time
+        if stream.last_transit is not None:
+            stream.jitter += (abs(transit - stream.last_transit) - stream.jitter) / 16
+        stream.last_transit = transit
+
+# This function calculates the results of a UDP transfer, given the amount of datagrams the client has sent
+def udp_result(stream, sent_packets):
+    # If no datagram has arrived, every datagram is lost
+    if stream is None or stream.packets == 0:
+        return {"bytes": 0, "duration": 0.0, "duration_ns": 0, "packets": 0, "sent": sent_packets, "lost": sent_packets, "out_of_order": 0, "jitter": 0.0}
+
+    # The duration is the time between the first and the last datagram
+    duration = stream.end_time - stream.start
+
+    # Returns the results, where the duration is in both seconds and nanoseconds and the jitter is in milliseconds
+    return {"bytes": stream.bytes, "duration": duration / 1e9, "duration_ns": duration, "packets": stream.packets, "sent": sent_packets, "lost": max(sent_packets - stream.packets, 0), "out_of_order": stream.out_of_order, "jitter": stream.jitter / 1e6}
+
+# This function returns the jitter and the loss columns of a UDP result in the table
+def udp_columns(result):
+    # Calculate the share of the datagrams that were lost
+    lost_percent = 100 * result["lost"] / result["sent"] if result["sent"] > 0 else 0.0
+
+    # Returns the columns
+    return [f"{result['jitter']:.3f} ms", f"{result['lost']}/{result['sent']} ({lost_percent:.2g}%)"]
+
+# This function prints the results of a UDP transfer that the server has received
+def print_udp_server_result(client_address, result, input_format):
+    # Defining the headers of the table
+    headers = ["ID", "Interval", "Received", "Rate", "Jitter", "Lost/Total"]
+
+    # Printing the values in a table format, where a record holds every value of the result
+    print_headers(headers)
+    print_result("stream", "server", f"{client_address[0]}:{client_address[1]}", 0, result["duration_ns"], result["bytes"], input_format, udp_columns(result), packets = result["packets"], sent = result["sent"], lost = result["lost"], out_of_order = result["out_of_order"], jitter = result["jitter"])
+
+    # Printing the amount of reordered datagrams, if any
+    if result["out_of_order"] > 0:
+        print_message(f"{client_address[0]}:{client_address[1]}: {result['out_of_order']} datagrams received out-of-order")
+
+# This function handles the control connection of a UDP transfer in the server, where the datagrams are received by handle_udp_server()
+async def handle_udp_test(connection, client_address, params, udp_streams, input_format):
+    # The datagrams are sent from the UDP port that the client has given in the parameters
+    udp_address = (client_address[0], params["udp_port"])
+
+    # The datagrams of the port are only counted while this connection is open, which the client waits for before the first datagram
+    udp_streams[udp_address] = UdpStream(f"{udp_address[0]}:{udp_address[1]}")
+    try:
+        await connection.send_message(MESSAGE_READY, {})
+
+        # Waiting until the client is done sending
+        message_type, done = await connection.recv_message()
+    except (OSError, ValueError) as error:
+        udp_streams.pop(udp_address, None)
+        print_message(f"Error: {client_address[0]}:{client_address[1]}: {error}")
+        return
+
+    # Checks if the client has sent the amount of datagrams
+    if message_type != MESSAGE_DONE:
+        udp_streams.pop(udp_address, None)
+        print_message(f"Error: {client_address[0]}:{client_address[1]}: Received an unexpected control message")
+        return
+
+    # Waiting for the datagrams that are still on their way, until every datagram has arrived or the grace time has passed
+    grace_end_time = time.monotonic() + UDP_GRACE_TIME
+    while time.monotonic() < grace_end_time and getattr(udp_streams.get(udp_address), "packets", 0) < done["packets"]:
+        await connection.sleep(0.01)
+
+    # Calculates the results of the transfer and removes its state
+    result = udp_result(udp_streams.pop(udp_address, None), done["packets"])
+
+    # Send the client the results of the transfer
+    await connection.send_message(MESSAGE_RESULT, result)
+
+    # Printing the results of the transfer
+    print_udp_server_result(udp_address, result, input_format)
+
+# This function sends the UDP probes of a client back until the client closes the control connection
+async def handle_udp_probe(connection, client_address, params, udp_probes):
+    # The probes are sent from the UDP port that the client has given in the parameters
+    udp_address = (client_address[0], params["udp_port"])
+
+    # Every datagram from the port is sent back while the control connection is open, which the client waits for before the first probe
+    udp_probes.add(udp_address)
+    try:
+        await connection.send_message(MESSAGE_READY, {})
+
+        # Waiting until the client closes its side of the connection
+        while await connection.recv(1):
+            pass
+    finally:
+        udp_probes.discard(udp_address)
+
+    # Send the client an acknowledgement
+    await connection.send_message(MESSAGE_RESULT, {"bytes": 0, "duration": 0.0})
+
+# This function prints a row for every stream with the bytes since the last report, and the headers of the table if given
+def print_intervals(streams, input_format, role, headers = None, probe = None, print_sums = True):
+    # Time of this report
+    now = time.monotonic_ns()
+
+    # Defining the rows of the table
+    data = []
+
+    # The sum of the bytes, the amount of streams, the interval, the target bitrate and the retransmits of every direction
+    # The sum covers the longest interval of the streams, since a stream may have started after the last report
+    sums = {}
+
+    # Iterate for each stream
+    for stream in streams:
+        # Reading the counters once, since the receive loop may update them at any time
+        received_bytes = stream.bytes
+        calls = stream.calls
+
+        # Bytes since the last report
+        interval_received_bytes = received_bytes - stream.reported_bytes
+
+        # Elapsed time in nanoseconds of the stream at the last report and at this report
+        interval_start = stream.reported_time - stream.start
+        interval_end = now - stream.start
+
+        # With the '--tcp-info' flag, the state of the connection in the kernel is printed next to the bytes
+        columns, fields = tcp_info_report(stream) if stream.socket is not None else ([], {})
+
+        # With the '--self-stats' flag, the calls of the loop since the last report are printed as well, where the CPU time is only known at the end
+        # The datagrams of a UDP stream are received by a loop that every UDP stream shares
+        if self_stats:
+            self_columns, self_fields = self_stats_report(calls - stream.reported_calls, interval_received_bytes, interval_end - interval_start) if not isinstance(stream, UdpStream) else (["-"] * len(SELF_STATS_HEADERS), {})
+            columns, fields = columns + self_columns, {**fields, **self_fields}
+            stream.reported_calls = calls
+
+        # Defining the data of the row
+        data.append(["interval", stream.name, interval_start, interval_end, interval_received_bytes, columns, stream.target, fields])
+
+        # Updates the values of the last report
+        stream.reported_bytes = received_bytes
+        stream.reported_time = now
+
+        # Updates the sum of every stream in the same direction
+        direction_sum = sums.setdefault(stream.direction, [0, 0, None, 0, 0])
+        direction_sum[0] += interval_received_bytes
+        direction_sum[1] += 1
+        if direction_sum[2] is None or interval_end - interval_start > direction_sum[2][1] - direction_sum[2][0]:
+            direction_sum[2] = (interval_start, interval_end)
+        direction_sum[3] = direction_sum[3] + stream.target if direction_sum[3] is not None and stream.target else None
+        direction_sum[4] += fields.get("retransmits", 0)
+
+    # If no stream is running, nothing is printed
+    if not data:
+        return
+
+    # If there are several streams in a direction, the sum of them in this interval is printed as well, unless the main process of the '-w' flag prints the sum of every process
+    # With the '--tcp-info' flag, the sum holds the retransmits of every stream together
+    for direction, (sum_bytes, sum_streams, sum_interval, sum_target, sum_retransmits) in sums.items():
+        if sum_streams > 1 and print_sums:
+            columns, fields = (tcp_info_sum_columns(sum_retransmits), {"retransmits": sum_retransmits}) if streams[0].socket is not None else ([], {})
+            if self_stats:
+                columns = columns + ["-"] * len(SELF_STATS_HEADERS)
+            data.append(["interval_sum", f"[SUM] {direction}" if direction else "[SUM]", sum_interval[0], sum_interval[1], sum_bytes, columns, sum_target, fields])
+
+    # If the '--probe' flag is enabled, the round-trip times of the interval are printed next to the throughput of every stream together
+    if probe is not None:
+        probe_histogram = probe.report_histogram()
+        probe_start, probe_end = probe.reported_time - probe.start, now - probe.start
+        probe.reported_time = now
+        data[-1][5] = data[-1][5] + probe_columns(probe_histogram)
+
+    # Printing the values in a table format
+    if headers is not None:
+        print_headers(headers)
+    for event, name, interval_start, interval_end, interval_bytes, columns, target, fields in data:
+        print_result(event, role, name, interval_start, interval_end, interval_bytes, input_format, columns, target, **fields)
+
+    # A record of the round-trip times of the interval follows the records of the throughput
+    if probe is not None and output_mode != "table":
+        print_rr_result("interval", role, probe.name, probe_start, probe_end, probe_histogram)
+
+# This function prints a row for every request/response stream with the round-trip times since the last report
+def print_rr_intervals(streams, role):
+    # Time of this report
+    now = time.monotonic_ns()
+
+    # Defining the rows of the table and the round-trip times of every stream
+    data = []
+    interval_histogram_sum = Histogram()
+
+    # The sum covers the longest interval of the streams, since a stream may have started after the last report
+    sum_interval = None
+
+    # Iterate for each stream
+    for stream in streams:
+        # Round-trip times since the last report
+        interval_histogram = stream.report_histogram()
+
+        # Elapsed time in nanoseconds of the stream at the last report and at this report
+        interval_start = stream.reported_time - stream.start
+        interval_end = now - stream.start
+
+        # Defining the data of the row
+        data.append(("interval", stream.name, interval_start, interval_end, interval_histogram))
+
+        # Updates the time of the last report
+        stream.reported_time = now
+
+        # Updates the sum of every stream
+        interval_histogram_sum.add(interval_histogram)
+        if sum_interval is None or interval_end - interval_start > sum_interval[1] - sum_interval[0]:
+            sum_interval = (interval_start, interval_end)
+
+    # If no stream is running, nothing is printed
+    if not data:
+        return
+
+    # If there are several streams, the round-trip times of every stream in this interval are printed as well
+    if len(data) > 1:
+        data.append(("interval_sum", "[SUM]", sum_interval[0], sum_interval[1], interval_histogram_sum))
+
+    # Printing the values in a table format
+    for event, name, interval_start, interval_end, interval_histogram in data:
+        print_rr_result(event, role, name, interval_start, interval_end, interval_histogram)
+
+# This function prints the interval reports of the server in a thread of its own, so the receive loops never check the time
+def report_server_intervals(server_streams, udp_streams, input_interval_time, input_format):
+    # Time of the next report
+    next_time = time.monotonic()
+
+    # Continues to report as long as the server runs
+    while True:
+        # Waits until the next report is due
+        next_time += input_interval_time
+        time.sleep(max(0, next_time - time.monotonic()))
+
+        # Printing a row for every TCP and UDP stream
+        print_intervals(list(server_streams.values()) + list(udp_streams.values()), input_format, "server", ["ID", "Interval", "Transfer", "Rate"] + (SELF_STATS_HEADERS if self_stats else []))
+
+# This function ends the warm-up of the '-O' flag for the streams of a connection, which are part of the interval reports from then on
+def omit_server_streams(server_streams, streams):
+    now = time.monotonic_ns()
+    for key, stream in streams.items():
+        stream.omit(now)
+        server_streams[key] = stream
+
+# This function sends every message of a request/response transfer back to the client, until the client closes its side of the connection
+def handle_rr_server(client_socket, stream, length):
+    # Every message is sent at once instead of waiting for more bytes to fill a packet
+    client_socket.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+
+    # Preallocating the buffer of a message, and a view of it so the bytes can be received into the remaining part of it
+    buffer = bytearray(length)
+    view = memoryview(buffer)
+
+    # Continues until the client closes its side of the connection
+    while True:
+        # Receives the whole message before it is sent back
+        received = 0
+        while received < length:
+            received_bytes = client_socket.recv_into(view[received:])
+            stream.calls += 1
+
+            # The transfer is complete when the client has shut down its sending side
+            if received_bytes == 0:
+                return
+            received += received_bytes
+
+        # Sends the message back to the client
+        client_socket.sendall(buffer)
+
+        # Accumulated values of Bytes and calls
+        stream.bytes += length
+        stream.calls += 1
+
+# This function handles the packages of one client in the server, where it will receives from the client
+# The threaded server and the event loop server share this function, and only differ in the I/O of the connection, which is a ThreadConnection or a LoopConnection
+async def handle_connection(connection, client_address, input_format, server_streams, udp_streams, udp_probes, udp_enabled = True, slots = None):
     # Using the client socket
-    with client_socket:
-        # Starting time at when a client connects and sends the bytes
-        start_time = time.time()
+    with connection.socket:
+        # Receiving the parameters of the test before the transfer starts
+        try:
+            message_type, params = await connection.recv_message()
+        except (ConnectionError, ValueError) as error:
+            print_message(f"Error: {client_address[0]}:{client_address[1]}: {error}")
+            return
+
+        # Checks if the client speaks the same version of the control protocol, and if the server has room for the test
+        # The client is told why a test is turned away, so it can exit with an error instead of sending to a closed connection
+        error = check_params(client_address, message_type, params, udp_enabled, slots)
+        if error is not None:
+            print_message(f"Error: {client_address[0]}:{client_address[1]}: {error}")
+            try:
+                await connection.send_message(MESSAGE_ERROR, {"error": error})
+            except OSError:
+                pass
+            return
+
+        # The client starts the test when it is accepted, where a UDP transfer or probe is accepted when the server is ready for its datagrams
+        if not (params.get("udp") or params.get("udp_probe")):
+            await connection.send_message(MESSAGE_READY, {})
+
+        # If the client sends UDP datagrams, this connection only carries the control messages
+        if params.get("udp"):
+            await handle_udp_test(connection, client_address, params, udp_streams, input_format)
+            return
+
+        # If the client sends UDP probes, the probes are sent back until the client closes this connection
+        if params.get("udp_probe"):
+            await handle_udp_probe(connection, client_address, params, udp_probes)
+            return
+
+        # A bulk stream starts when the client has started every stream, so both sides measure the same time and leave out the same warm-up
+        if not params.get("rr"):
+            try:
+                message_type = (await connection.recv_message())[0]
+                if message_type != MESSAGE_START:
+                    raise ConnectionError("Received an unexpected control message")
+            except (ConnectionError, ValueError) as error:
+                print_message(f"Error: {client_address[0]}:{client_address[1]}: {error}")
+                return
+
+        # The state of the stream, which starts when the client sends the bytes and is read by the interval reports
+        # With the '-R' flag the client does not send, so only the stream that the server sends is part of the reports
+        # A TCP probe of the '--probe' flag is not a bulk stream, so it is left out of the reports and the sums of the server
+        stream = Stream(f"{client_address[0]}:{client_address[1]}", "RX" if params.get("bidir") else None)
+        report_streams = {}
+        if not (params.get("reverse") or params.get("probe")):
+            report_streams[client_address] = stream
+
+        # With the '-R' flag and the '--bidir' flag, the server sends to the client next to the receiving loop
+        send_stream = None
+        if params.get("reverse") or params.get("bidir"):
+            send_stream = Stream(f"{client_address[0]}:{client_address[1]}", "TX")
+            report_streams[(client_address, "TX")] = send_stream
+            sender = connection.start_sender(send_stream, params)
+
+        # With the '-O' flag, the streams are only part of the interval reports and the results after the warm-up, which starts when the streams start
+        omit_timer = None
+        if params.get("omit"):
+            omit_timer = connection.call_later(params["omit"], omit_server_streams, server_streams, report_streams)
+        else:
+            server_streams.update(report_streams)
+
+        # If the client measures the round-trip time, every message is sent back as soon as it has arrived
+        if params.get("rr"):
+            await connection.echo_messages(stream, params["length"])
+
+        # Otherwise the bytes are received until the client closes its side of the connection, which marks the end of the transfer
+        else:
+            await connection.receive_bytes(stream)
+
+        # A transfer that ends during the warm-up is not left out, and the streams are not added to the reports after they are removed
+        if omit_timer is not None:
+            connection.cancel_timer(omit_timer)
+
+        # Time of the loop, which ends when the server has received the completion of the transfer
+        connection.stop_clock(stream)
+
+        # Duration of the transfer in nanoseconds, from the start of the stream until the server has received the completion of the transfer
+        duration = stream.end_time - stream.start
+
+        # The stream is complete and no longer part of the interval reports
+        server_streams.pop(client_address, None)
+
+        # Accumulated values of Bytes after the warm-up of the '-O' flag
+        total_received_bytes = stream.measured_bytes()
+
+        # If the server sends as well, the client closes its side when the transfer is complete, and the server stops sending unless it sends a given amount of bytes
+        # The server closes its side when it is done, which marks the end of the transfer for the client instead of the results
+        if send_stream is not None:
+            if params.get("num") is None:
+                send_stream.running = False
+            await connection.join_sender(sender)
+            server_streams.pop((client_address, "TX"), None)
+
+            # Printing the results of the bytes the server has sent
+            print_server_result(send_stream, send_stream.measured_bytes(), send_stream.end_time - send_stream.start, input_format, "Sent")
+
+        # Otherwise the server sends the client the exact results of the transfer as an acknowledgement
+        else:
+            # The bytes include the warm-up, so the client can check them against every byte it has sent
+            await connection.send_message(MESSAGE_RESULT, {"bytes": stream.bytes, "duration": duration / 1e9})
+
+        # Printing the results of the transfer, unless the client has only received, or the connection is a probe
+        if not (params.get("reverse") or params.get("probe")):
+            print_server_result(stream, total_received_bytes, duration, input_format)
+
+# The I/O of a connection of the threaded server, where every call blocks the thread of the connection
+# The calls are coroutines that never wait, so handle_connection() runs to its end in the thread without an event loop
+class ThreadConnection:
+    def __init__(self, client_socket, buffer_length):
+        self.socket = client_socket
+        self.buffer_length = buffer_length
+
+    # Receives a control message, and returns the type and the payload
+    async def recv_message(self):
+        return recv_message(self.socket)
+
+    # Sends a control message
+    async def send_message(self, message_type, payload):
+        send_message(self.socket, message_type, payload)
+
+    # Receives at most the given amount of bytes
+    async def recv(self, length):
+        return self.socket.recv(length)
+
+    # Waits for the given seconds
+    async def sleep(self, seconds):
+        time.sleep(seconds)
+
+    # Receives the bytes of the stream until the client closes its side of the connection
+    async def receive_bytes(self, stream):
+        # Preallocating the buffer once, so that the receive loop does not allocate new bytes for every call
+        buffer = bytearray(self.buffer_length)
+
+        while True:
+            # Receiving the bytes from the client directly into the buffer
+            received_bytes = self.socket.recv_into(buffer)
+            stream.calls += 1
+
+            # The transfer is complete when the client has shut down its sending side
+            if received_bytes == 0:
+                return
+
+            # Accumulated values of Bytes
+            stream.bytes += received_bytes
+
+    # Sends every message of a request/response transfer back to the client
+    async def echo_messages(self, stream, length):
+        handle_rr_server(self.socket, stream, length)
+
+    # Starts to send the bytes of the '-R' flag or the '--bidir' flag in a thread of its own, and returns the thread
+    def start_sender(self, stream, params):
+        sender = threading.Thread(target=send_bytes, args=(self.socket, stream, params.get("num"), params["length"], False, params.get("bitrate"), params.get("pacing", False)))
+        sender.start()
+        return sender
+
+    # Waits until the sender is done
+    async def join_sender(self, sender):
+        sender.join()
+
+    # Calls the function with the arguments after the given seconds in a thread of its own, and returns the timer
+    def call_later(self, delay, function, *args):
+        timer = threading.Timer(delay, function, args=args)
+        timer.start()
+        return timer
+
+    # Cancels the timer, and waits until a call that has already started is done
+    def cancel_timer(self, timer):
+        timer.cancel()
+        timer.join()
+
+    # Stops the clock of the stream, where the CPU time of the loop is the CPU time of this thread
+    def stop_clock(self, stream):
+        stream.stop_clock()
+
+# This function runs a coroutine of a connection of the threaded server to its end in the calling thread
+# The I/O of a ThreadConnection blocks instead of waiting, so the coroutine never gives up its turn
+def run_blocking(coroutine):
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError("A connection of the threaded server waited for an event loop")
+
+# This function handles the packages of one client in a thread of its own, where it will receives from the client
+def handle_server(client_socket, client_address, input_format, buffer_length, server_streams, udp_streams, udp_probes, udp_enabled = True, slots = None):
+    run_blocking(handle_connection(ThreadConnection(client_socket, buffer_length), client_address, input_format, server_streams, udp_streams, udp_probes, udp_enabled, slots))
+
+# This function receives exactly the given amount of bytes from a non-blocking socket in the event loop
+async def recv_exact_async(loop, connection_socket, length):
+    # Preallocating the buffer for the bytes
+    buffer = bytearray(length)
+
+    # A view of the buffer, so the bytes can be received into the remaining part of it
+    view = memoryview(buffer)
+
+    # Amount of bytes that has been received so far
+    received = 0
+
+    # Continues until the buffer is filled
+    while received < length:
+        # Waiting for the bytes without blocking the other connections
+        received_bytes = await loop.sock_recv_into(connection_socket, view[received:])
+
+        # If the connection is closed before every byte has arrived
+        if received_bytes == 0:
+            raise ConnectionError("Connection closed in the middle of a control message")
+
+        # Updates the amount of received bytes
+        received += received_bytes
+
+    # Returns the received bytes
+    return bytes(buffer)
+
+# This function receives a control message in the event loop and returns the type and the payload
+async def recv_message_async(loop, connection_socket):
+    # Receiving and unpacking the header of the message
+    message_type, length = decode_header(await recv_exact_async(loop, connection_socket, CONTROL_HEADER.size))
+
+    # Receiving and decoding the payload of the message
+    payload = json.loads(await recv_exact_async(loop, connection_socket, length))
+
+    # Returns the type and the payload of the message
+    return message_type, payload
+
+# This function sends every message of a request/response transfer back to the client in the event loop
+async def handle_rr_server_async(loop, client_socket, stream, length):
+    # Every message is sent at once instead of waiting for more bytes to fill a packet
+    client_socket.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+
+    # The message must stay in the buffer while it is sent back, so every connection has a buffer of its own
+    buffer = bytearray(length)
+    view = memoryview(buffer)
+
+    # Continues until the client closes its side of the connection
+    while True:
+        # Receives the whole message before it is sent back
+        received = 0
+        while received < length:
+            received_bytes = await loop.sock_recv_into(client_socket, view[received:])
+            stream.calls += 1
+
+            # The transfer is complete when the client has shut down its sending side
+            if received_bytes == 0:
+                return
+            received += received_bytes
+
+        # Sends the message back to the client without blocking the other connections
+        await loop.sock_sendall(client_socket, buffer)
+
+        # Accumulated values of Bytes and calls
+        stream.bytes += length
+        stream.calls += 1
+
+# This function sends the bytes to the client in the event loop until the stream is stopped, or the given amount of bytes is sent
+async def send_bytes_async(loop, client_socket, stream, num_bytes, buffer_length, bitrate = None, pacing = False):
+    # Payload to be sent in every call, which is allocated only once
+    payload = memoryview(b"0" * buffer_length)
+
+    # With the '--pacing' flag, the kernel spaces out the packets of every batch at the target bitrate
+    # The batches are still sent at the target bitrate, so the socket buffer does not fill up and drain after the end of the transfer
+    if bitrate is not None and pacing and not enable_pacing(client_socket, bitrate):
+        print_message("Warning: SO_MAX_PACING_RATE is not supported, so the packets of every batch are sent at once")
+
+    # Amount of bytes in a batch, which is what the target bitrate sends in the batch time, or a single buffer without a target bitrate
+    batch = max(1, int(bitrate / 8 * TCP_BATCH_TIME)) if bitrate is not None else buffer_length
+
+    # Starting time at when the server sends the bytes, and the time in nanoseconds that the tokens of the last batch arrived at
+    stream.start_clock()
+    next_time = stream.start
+
+    # Sends the bytes in batches without blocking the other connections, where the last batch of a given amount only holds the remaining bytes
+    while stream.running and (num_bytes is None or stream.bytes < num_bytes):
+        batch_end = stream.bytes + batch if num_bytes is None else min(stream.bytes + batch, num_bytes)
+        batch_bytes = batch_end - stream.bytes
+
+        # A call that sends at once does not give the other tasks a turn, so the receiving side of the connection would never run
+        if bitrate is None:
+            await asyncio.sleep(0)
+
+        # With a target bitrate, the bucket starts empty and the tokens of every batch arrive at that rate, so no interval sends more than the target
+        # A sender that has fallen behind only catches up one batch, and the stream is not sent to once the timer has stopped it while it waited
+        else:
+            next_time = await wait_for_tokens_async(next_time, batch_bytes, bitrate)
+            if not stream.running:
+                break
+
+        while stream.bytes < batch_end:
+            length = min(buffer_length, batch_end - stream.bytes)
+            await loop.sock_sendall(client_socket, payload[:length])
+            stream.bytes += length
+            stream.calls += 1
 
-        # Starting value of received Bytes
-        total_received_bytes = 0
+    # Time at when the last byte was sent
+    stream.end_time = time.monotonic_ns()
 
-        # Continues to receive the bytes from the client
+    # Shuts down the sending side of the connection to indicate that the transfer is complete
+    client_socket.shutdown(SHUT_WR)
+
+# The I/O of a connection in the event loop, where every call waits without blocking the other connections
+class LoopConnection:
+    def __init__(self, loop, client_socket, buffer):
+        self.loop = loop
+        self.socket = client_socket
+
+        # Only one task receives at a time, so every connection shares the buffer of the event loop, of which a turn uses at most the first part
+        self.buffer = buffer
+        self.turn_buffer = memoryview(buffer)[:EVENT_LOOP_TURN_BYTES]
+
+    # Receives a control message, and returns the type and the payload
+    async def recv_message(self):
+        return await recv_message_async(self.loop, self.socket)
+
+    # Sends a control message
+    async def send_message(self, message_type, payload):
+        await self.loop.sock_sendall(self.socket, encode_message(message_type, payload))
+
+    # Receives at most the given amount of bytes
+    async def recv(self, length):
+        return await self.loop.sock_recv(self.socket, length)
+
+    # Waits for the given seconds
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    # Receives the bytes of the stream until the client closes its side of the connection
+    async def receive_bytes(self, stream):
         while True:
-            # Receiving the bytes from the client
-            received_bytes = client_socket.recv(1000)
+            # Receiving the bytes of a single turn into the buffer that is shared by every connection in the event loop
+            received_bytes = await self.loop.sock_recv_into(self.socket, self.turn_buffer)
+            stream.calls += 1
+
+            # The transfer is complete when the client has shut down its sending side
+            if received_bytes == 0:
+                return
+
+            # Accumulated values of Bytes
+            stream.bytes += received_bytes
+
+            # A call that receives at once does not give the other tasks a turn, so a busy connection would keep the event loop to itself
+            # Every other connection, the task that sends on the same connection and the interval reports get a turn after every call
+            await asyncio.sleep(0)
+
+    # Sends every message of a request/response transfer back to the client
+    async def echo_messages(self, stream, length):
+        await handle_rr_server_async(self.loop, self.socket, stream, length)
+
+    # Starts to send the bytes of the '-R' flag or the '--bidir' flag in a task of its own, and returns the task
+    def start_sender(self, stream, params):
+        return self.loop.create_task(send_bytes_async(self.loop, self.socket, stream, params.get("num"), params["length"], params.get("bitrate"), params.get("pacing", False)))
+
+    # Waits until the sender is done
+    async def join_sender(self, sender):
+        await sender
+
+    # Calls the function with the arguments after the given seconds in the event loop, and returns the handle of the call
+    def call_later(self, delay, function, *args):
+        return self.loop.call_later(delay, function, *args)
+
+    # Cancels the call, which runs in the event loop, so it is never halfway done
+    def cancel_timer(self, timer):
+        timer.cancel()
+
+    # Stops the clock of the stream, where the CPU time is not known, since the thread runs every connection
+    def stop_clock(self, stream):
+        stream.end_time = time.monotonic_ns()
+
+# This function handles the packages of one client in the event loop, where it will receives from the client
+async def handle_server_async(loop, client_socket, client_address, input_format, buffer, server_streams, udp_streams, udp_probes, udp_enabled = True, slots = None):
+    await handle_connection(LoopConnection(loop, client_socket, buffer), client_address, input_format, server_streams, udp_streams, udp_probes, udp_enabled, slots)
+
+# This function handles every connection in a single event loop, until the server is shut down or the '--one-off' flag is done
+async def serve_event_loop(server_socket, ip_address, port_number, input_format, buffer_length, input_interval_time, server_streams, udp_streams, udp_probes, udp_enabled, max_tests, one_off, shutdown_signals):
+    # Defining the event loop that runs the server
+    loop = asyncio.get_running_loop()
 
-            # Accumulated values of Bytes 
-            total_received_bytes = total_received_bytes + len(received_bytes)
+    # If the '-i' flag is enabled, the interval reports are printed by a timer in the event loop
+    if input_interval_time is not None:
+        # Time of the next report
+        next_time = loop.time() + input_interval_time
 
-            # Receving confirmation that the transfer is complete
-            if "BYE" in received_bytes.decode(): 
-                # Send the client an acknowledgement of the confirmation
-                client_socket.sendall("ACK: BYE".encode())
+        # This function prints the report and schedules the next one
+        def report():
+            nonlocal next_time
+            print_intervals(list(server_streams.values()) + list(udp_streams.values()), input_format, "server", ["ID", "Interval", "Transfer", "Rate"] + (SELF_STATS_HEADERS if self_stats else []))
+            next_time += input_interval_time
+            loop.call_at(next_time, report)
 
-                # Ending the loop
+        # Schedules the first report
+        loop.call_at(next_time, report)
+
+    # The listening socket must not block the event loop
+    server_socket.setblocking(False)
+
+    # Only one task receives at a time, so every connection can share a single buffer
+    buffer = bytearray(buffer_length)
+
+    # Keeping a reference to the running tasks, so they are not garbage collected, and so the server can wait for them when it shuts down
+    tasks = set()
+
+    # If the '--max-tests' flag is enabled, the connections of a test over the limit are turned away
+    slots = TestSlots(max_tests) if max_tests is not None else None
+
+    # This function accepts the connections until it is cancelled
+    async def accept_connections():
+        # Waiting for a client to connect
+        while True:
+            # Accepting a connection request from a client
+            client_socket, client_address = await loop.sock_accept(server_socket)
+
+            # The client socket must not block the event loop
+            client_socket.setblocking(False)
+
+            # Printing a message to indicate that the client is connected to the server
+            print_message(f"A simpleperf client with {client_address[0]}:{client_address[1]} is connected with {ip_address}:{port_number}")
+
+            # Creates a new task to handle the connection
+            task = loop.create_task(handle_server_async(loop, client_socket, client_address, input_format, buffer, server_streams, udp_streams, udp_probes, udp_enabled, slots))
+
+            # Keeps the task until it is done, and then frees the place of its test
+            tasks.add(task)
+            task.add_done_callback(lambda task, client_address = client_address: connection_done(task, client_address))
+
+    # This function is called when a connection is done
+    def connection_done(task, client_address):
+        tasks.discard(task)
+        if slots is not None:
+            slots.release(client_address)
+
+        # With the '--one-off' flag, the server stops accepting when the last connection of the first client is done
+        if one_off and not tasks:
+            accepting.cancel()
+
+    # This function stops accepting at the first signal, and stops every connection at the second
+    def shut_down():
+        if not accepting.done():
+            print_message(f"Shutting down, waiting for {len(tasks)} connections to finish (press Ctrl-C again to stop them)")
+            accepting.cancel()
+        else:
+            for task in tasks:
+                task.cancel()
+
+    # The signals of the '-s' flag, or the SIGTERM of the main process of the '-w' flag, shut down the server gracefully
+    for signal_number in shutdown_signals:
+        loop.add_signal_handler(signal_number, shut_down)
+
+    # Accepts the connections until the server is shut down
+    accepting = loop.create_task(accept_connections())
+    try:
+        await accepting
+    except asyncio.CancelledError:
+        pass
+
+    # Waits for the running connections to finish
+    await asyncio.gather(*tasks, return_exceptions = True)
+
+# This function handles the connections of the threaded server until it is shut down, and then waits for the running connections to finish
+def serve_threads(server_socket, ip_address, port_number, input_format, buffer_length, server_streams, udp_streams, udp_probes, udp_enabled, max_tests, one_off):
+    # The threads of the running connections, which the server waits for when it shuts down
+    threads = set()
+
+    # If the '--max-tests' flag is enabled, the connections of a test over the limit are turned away
+    slots = TestSlots(max_tests) if max_tests is not None else None
+
+    # This function handles a connection in a thread of its own, and frees the place of its test when it is done
+    def run_connection(client_socket, client_address):
+        try:
+            handle_server(client_socket, client_address, input_format, buffer_length, server_streams, udp_streams, udp_probes, udp_enabled, slots)
+        finally:
+            threads.discard(threading.current_thread())
+            if slots is not None:
+                slots.release(client_address)
+
+            # With the '--one-off' flag, the server stops accepting when the last connection of the first client is done
+            # Shutting down the listening socket wakes up the accept() call of the main thread
+            if one_off and not threads:
+                try:
+                    server_socket.shutdown(SHUT_RDWR)
+                except OSError:
+                    pass
+
+    try:
+        # Waiting for a client to connect
+        while True:
+            # Accepting a connection request from a client, until the '--one-off' flag has shut down the listening socket
+            try:
+                client_socket, client_address = server_socket.accept()
+            except OSError:
                 break
-        
-        # Ending time at when the server has acknowledged the completion of the transfer
-        end_time = time.time()
 
-        # Duration of the transfer
-        duration =  end_time - start_time
+            # Printing a message to indicate that the client is connected to the server
+            print_message(f"A simpleperf client with {client_address[0]}:{client_address[1]} is connected with {ip_address}:{port_number}")
 
-        # Formating the values of the bytes in either bytes, kilobytes or megabytes
-        total_received_bytes_format = format_values(total_received_bytes, input_format)
+            # Creates a new thread to handle the connection, which does not keep the program alive once the server is done
+            thread = threading.Thread(target=run_connection, args=(client_socket, client_address), daemon=True)
 
-        # Calculate the rate of incoming trafic in megabites per second
-        rate = (total_received_bytes * 8e-6) / duration
+            # Initiates the thread
+            threads.add(thread)
+            thread.start()
 
-        # Defining the headers of the table
-        headers = ["ID", "Interval", "Received", "Rate"]
-        
-        # Defining the data of the table
-        data = [[f"{client_address[0]}:{client_address[1]}", f"0.0 - {duration:.1f}", f"{total_received_bytes_format:.2f} {input_format}", f"{rate:.2f} Mbps"],]
-        
-        # Printing the values in a table format
-        print_table(headers)
-        for row in data:
-            print_table(row)
-    
-    # Closes the socket connection with the client
-    client_socket.close()
+    # Ctrl-C or SIGTERM stops accepting new connections
+    except KeyboardInterrupt:
+        print_message(f"Shutting down, waiting for {len(threads)} connections to finish (press Ctrl-C again to stop them)")
+
+    # Waits for the running connections to finish, where a second Ctrl-C or SIGTERM stops them
+    server_socket.close()
+    try:
+        for thread in list(threads):
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+
+# This function runs a server in this process, or as one of the workers of the '-w' flag that share the port
+def run_server(args, start_barrier = None, cpu = None):
+    # The output format and the '--self-stats' flag, which a worker does not share with the main process under the spawn or forkserver start methods
+    apply_settings(args)
 
-# This function starts the server and listens for incoming connections
-def start_server(args):
     # Defining the IP address using the '-b' flag
     ip_address = args.bind
     
@@ -189,41 +1806,299 @@ def start_server(args):
     # Defining the specified format to be shown using'-f' flag
     input_format = args.format
 
-    # Creates a TCP socket
-    with socket(AF_INET, SOCK_STREAM) as server_socket:
-        # Bind socket to the server
-        server_socket.bind((ip_address, port_number))
+    # Defining the size of the receive buffer using the '-l' flag
+    buffer_length = format_num(args.length)
 
-        # Listen for incoming connections
-        server_socket.listen()
+    # Defining the interval in seconds using the '-i' flag
+    input_interval_time = args.interval
 
-        # Defining the message that confirms that the server is listening
-        server_message = f"A simpleperf server is listening on port {port_number}"
+    # The state of every TCP transfer, where the key is the address of the client
+    server_streams = {}
 
-        # Defining the lines to be used in the message 
-        server_message_line = f"-" * len(server_message)
+    # The state of every UDP transfer, where the key is the address the datagrams are sent from
+    udp_streams = {}
 
-        # Prints out the message that the server is listening
-        print(server_message_line)
-        print(server_message)
-        print(server_message_line)
+    # The addresses that the UDP probes of the '--probe' flag are sent from
+    udp_probes = set()
 
-        # Waiting for a client to connect    
-        while True:
-            # Accepting a connection request from a client
-            client_socket, client_address = server_socket.accept()
+    # A worker of the '-w' flag only handles TCP, since the UDP port cannot be shared between the workers
+    worker = start_barrier is not None
 
-            # Printing a message to indicate that the client is connected to the server
-            print(f"A simpleperf client with {client_address[0]}:{client_address[1]} is connected with {ip_address}:{port_number}")
+    # A worker shuts down at the SIGTERM of the main process, which handles Ctrl-C for every worker, while a single server handles both
+    if worker:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        shutdown_signals = [signal.SIGTERM]
+    else:
+        shutdown_signals = [signal.SIGINT, signal.SIGTERM]
+    for signal_number in shutdown_signals:
+        signal.signal(signal_number, signal.default_int_handler)
+
+    # If the '-A' flag is enabled, the worker only runs on the given CPU core
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+
+    # Creates a TCP socket, and a UDP socket for the datagrams from UDP clients
+    with socket(AF_INET, SOCK_STREAM) as server_socket, socket(AF_INET, SOCK_DGRAM) as udp_socket:
+        try:
+            # A restarted server can bind the port while the connections of the last run are still in TIME_WAIT
+            server_socket.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+
+            # Every worker has a listening socket of its own on the same port, and the kernel spreads the connections across them
+            if worker:
+                server_socket.setsockopt(SOL_SOCKET, SO_REUSEPORT, 1)
+
+            # Bind socket to the server
+            server_socket.bind((ip_address, port_number))
+
+            # Bind the UDP socket to the same port, and receive the datagrams in a thread of its own
+            # A large receive buffer lets the socket hold bursts of datagrams while the thread is busy
+            if not worker:
+                udp_socket.setsockopt(SOL_SOCKET, SO_RCVBUF, 4 * 1024 * 1024)
+                udp_socket.bind((ip_address, port_number))
+                threading.Thread(target=handle_udp_server, args=(udp_socket, udp_streams, udp_probes), daemon=True).start()
+
+            # Listen for incoming connections, where the kernel queues up to the '--backlog' flag of connections that are not accepted yet
+            server_socket.listen(args.backlog)
+        except OSError as error:
+            # Releases the main process instead of letting it wait for this worker
+            if worker:
+                start_barrier.abort()
+            sys.exit(f"Error: {error}")
+
+        # A worker waits until every worker is listening, and the main process prints the message
+        if worker:
+            try:
+                start_barrier.wait()
+            except threading.BrokenBarrierError:
+                return
+        else:
+            # Defining the message that confirms that the server is listening
+            server_message = f"A simpleperf server is listening on port {port_number}"
+
+            # Defining the lines to be used in the message 
+            server_message_line = f"-" * len(server_message)
+
+            # Prints out the message that the server is listening
+            print_message(server_message_line)
+            print_message(server_message)
+            print_message(server_message_line)
+
+        # If the '-E' flag is enabled, every connection is handled in a single event loop
+        if args.event_loop:
+            asyncio.run(serve_event_loop(server_socket, ip_address, port_number, input_format, buffer_length, input_interval_time, server_streams, udp_streams, udp_probes, not worker, args.max_tests, args.one_off, shutdown_signals))
+            return
+
+        # If the '-i' flag is enabled, the interval reports are printed by a thread of its own
+        if input_interval_time is not None:
+            threading.Thread(target=report_server_intervals, args=(server_streams, udp_streams, input_interval_time, input_format), daemon=True).start()
+
+        # Handles every connection in a thread of its own until the server is shut down
+        serve_threads(server_socket, ip_address, port_number, input_format, buffer_length, server_streams, udp_streams, udp_probes, not worker, args.max_tests, args.one_off)
+
+# This function starts the server and listens for incoming connections, in this process or in the workers of the '-w' flag
+def start_server(args):
+    # Defining the amount of workers using the '-w' flag
+    input_processes = args.processes
 
-            # Creates a new thread to handle the connection
-            thread = threading.Thread(target=handle_server, args=(client_socket, client_address, input_format))
+    # The usage of the server from the start, if the '--self-stats' flag is enabled
+    start_usage = read_usage() if args.self_stats else None
 
-            # Initiates the thread
-            thread.start()
+    # A single server runs in this process
+    if input_processes == 1:
+        run_server(args, cpu = sorted(os.sched_getaffinity(0))[0] if args.affinity else None)
+        if start_usage is not None:
+            print_self_stats("server", start_usage, input_processes)
+        return
+
+    # Every worker and this process waits for each other until every worker is listening
+    start_barrier = multiprocessing.Barrier(input_processes + 1)
+
+    # If the '-A' flag is enabled, the workers are spread across the available CPU cores
+    cores = sorted(os.sched_getaffinity(0)) if args.affinity else None
+
+    # Anything printed so far must be written before the workers copy the output buffer
+    sys.stdout.flush()
+
+    # Creates every worker
+    process_list = []
+    for i in range(input_processes):
+        process = multiprocessing.Process(target=run_server, args=(args, start_barrier, cores[i % len(cores)] if cores else None))
+        process_list.append(process)
+        process.start()
+
+    # Waiting until every worker is listening
+    try:
+        start_barrier.wait()
+    except threading.BrokenBarrierError:
+        for process in process_list:
+            process.terminate()
+        sys.exit("Error: Not every server worker could listen on the port")
+
+    # Defining the message that confirms that the server is listening
+    server_message = f"A simpleperf server is listening on port {args.port} with {input_processes} workers"
+
+    # Prints out the message that the server is listening
+    print_message("-" * len(server_message))
+    print_message(server_message)
+    print_message("-" * len(server_message))
+    sys.stdout.flush()
+
+    # The workers ignore Ctrl-C, so this process forwards the first Ctrl-C or SIGTERM as a SIGTERM to every worker, which then stops accepting
+    # A second one stops the connections that are still running
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    while any(process.is_alive() for process in process_list):
+        try:
+            for process in process_list:
+                process.join()
+        except KeyboardInterrupt:
+            for process in process_list:
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGTERM)
+
+    # Printing the usage of every worker together, once they have exited
+    if start_usage is not None:
+        print_self_stats("server", start_usage, input_processes)
+
+# This function creates the payload that the client sends in every call
+def create_payload(buffer_length, zerocopy):
+    # The payload is allocated once and reused for the whole transfer
+    payload = memoryview(b"0" * buffer_length)
+
+    # If the '-Z' flag is not enabled, the payload is sent directly from the buffer
+    if not zerocopy:
+        return payload, None
+
+    # Creates an anonymous in-memory file if the platform supports it, otherwise a temporary file
+    if hasattr(os, "memfd_create"):
+        payload_fd = os.memfd_create("simpleperf")
+    else:
+        payload_fd = os.dup(tempfile.TemporaryFile().fileno())
+
+    # Writes the payload once to the file, so sendfile() can send it from the page cache without copying
+    os.write(payload_fd, payload)
+
+    # Returns the payload and the file descriptor that holds it
+    return payload, payload_fd
+
+# This function sends the given amount of bytes of the payload to the server
+def send_payload(client_socket, payload, payload_fd, length):
+    # If the '-Z' flag is enabled, the kernel sends the bytes directly from the file
+    if payload_fd is not None:
+        # Offset of the bytes that has been sent so far
+        offset = 0
+
+        # sendfile() may send less than requested, so it continues until everything is sent
+        while offset < length:
+            offset += os.sendfile(client_socket.fileno(), payload_fd, offset, length - offset)
+    else:
+        # Sending a view of the payload, which does not copy the bytes
+        client_socket.sendall(payload[:length])
+
+    # Returns the amount of bytes that has been sent
+    return length
+
+# This function lets the kernel space out the packets of the socket at the given bitrate (SO_MAX_PACING_RATE in Linux 4.13 or newer)
+def enable_pacing(connection_socket, bitrate):
+    # The rate is given to the kernel in bytes per second, as a 32-bit value
+    try:
+        connection_socket.setsockopt(SOL_SOCKET, SO_MAX_PACING_RATE, struct.pack("=I", min(int(bitrate / 8), 0xFFFFFFFF)))
+    except OSError:
+        return False
+
+    # The kernel paces the socket
+    return True
+
+# This function returns the time in nanoseconds that the tokens of a batch arrive at, after the tokens of the last batch arrived at the given time
+# A sender that has fallen behind by more than a batch only catches up one batch, so the bucket never holds more than a single batch
+def batch_token_time(last_time, batch_bytes, bitrate, now):
+    return max(last_time + int(batch_bytes * 8e9 / bitrate), now - int(TCP_BATCH_TIME * 1e9))
+
+# This function waits until the tokens of a batch have arrived, and returns the time they arrived at
+def wait_for_tokens(last_time, batch_bytes, bitrate):
+    now = time.monotonic_ns()
+    token_time = batch_token_time(last_time, batch_bytes, bitrate, now)
+    if token_time > now:
+        time.sleep((token_time - now) / 1e9)
+    return token_time
+
+# This function waits in the event loop until the tokens of a batch have arrived, and returns the time they arrived at
+async def wait_for_tokens_async(last_time, batch_bytes, bitrate):
+    now = time.monotonic_ns()
+    token_time = batch_token_time(last_time, batch_bytes, bitrate, now)
+    await asyncio.sleep(max(0, token_time - now) / 1e9)
+    return token_time
+
+# This function sends the bytes in batches at the target bitrate, where a token bucket that starts empty and holds a single batch decides when the next batch is sent
+def send_batches(client_socket, stream, num_bytes, buffer_length, payload, payload_fd, bitrate):
+    # Amount of bytes in a batch, which is what the target bitrate sends in the batch time
+    batch = max(1, int(bitrate / 8 * TCP_BATCH_TIME))
+
+    # The time in nanoseconds that the tokens of the last batch arrived at
+    next_time = stream.start
+
+    # Transfer the batches until the timer stops the stream, or every byte of the '-n' flag is sent
+    while stream.running and (num_bytes is None or stream.bytes < num_bytes):
+        # The bytes at the end of this batch, where the last batch of the '-n' flag only holds the remaining bytes
+        batch_end = stream.bytes + batch if num_bytes is None else min(stream.bytes + batch, num_bytes)
+        batch_bytes = batch_end - stream.bytes
+
+        # Waits for the tokens of the batch, so the bytes sent by any time never exceed what the target bitrate sends by then
+        # This is the only time the loop reads the clock, and the batch is not sent if the timer has stopped the stream in the meantime
+        next_time = wait_for_tokens(next_time, batch_bytes, bitrate)
+        if not stream.running:
+            break
+
+        # Sends the batch in calls of at most the buffer size, without checking the time
+        while stream.bytes < batch_end:
+            stream.bytes += send_payload(client_socket, payload, payload_fd, min(buffer_length, batch_end - stream.bytes))
+            stream.calls += 1
+
+# This function sends the bytes until the stream is stopped, or the given amount of bytes is sent, and then shuts down the sending side of the connection
+def send_bytes(client_socket, stream, num_bytes, buffer_length, zerocopy, bitrate = None, pacing = False, send_start = False):
+    # Payload to be sent in every call, which is allocated only once
+    payload, payload_fd = create_payload(buffer_length, zerocopy)
+
+    # With the '--pacing' flag, the kernel spaces out the packets of every batch at the target bitrate
+    # The batches are still sent at the target bitrate, so the socket buffer does not fill up and drain after the end of the transfer
+    if bitrate is not None and pacing and not enable_pacing(client_socket, bitrate):
+        print_message("Warning: SO_MAX_PACING_RATE is not supported, so the packets of every batch are sent at once")
+
+    # Starting time at when the bytes are sent
+    stream.start_clock()
+
+    # The client tells the server that the stream starts, right before the first byte
+    if send_start:
+        send_message(client_socket, MESSAGE_START, {})
+
+    # With the '--bitrate' flag, the bytes are sent in batches at the target bitrate
+    if bitrate is not None:
+        send_batches(client_socket, stream, num_bytes, buffer_length, payload, payload_fd, bitrate)
+
+    # If a given amount of bytes is sent, the bytes are sent until every byte is sent, without checking the time
+    elif num_bytes is not None:
+        while stream.bytes < num_bytes:
+            # The last call only sends the remaining bytes
+            stream.bytes += send_payload(client_socket, payload, payload_fd, min(buffer_length, num_bytes - stream.bytes))
+            stream.calls += 1
+
+    # Otherwise the bytes are sent until the timer stops the stream, so the loop never reads the clock
+    else:
+        while stream.running:
+            stream.bytes += send_payload(client_socket, payload, payload_fd, buffer_length)
+            stream.calls += 1
+
+    # Time and CPU time at when the last byte was sent
+    stream.stop_clock()
+
+    # Closes the file that holds the payload for the '-Z' flag
+    if payload_fd is not None:
+        os.close(payload_fd)
+
+    # Shuts down the sending side of the connection to indicate that the transfer is complete
+    client_socket.shutdown(SHUT_WR)
 
 # This function handles the packages in the client, where it will transfer to the server
-def handle_client(client_socket, client_ip_address, client_port_number, input_time, input_format, input_interval_time, input_num):
+def handle_client(client_socket, stream, input_time, input_format, input_num, buffer_length, zerocopy, bitrate, pacing, omit, results):
     # If the '-n' flag is enabled
     if input_num is not None:
         # Defining the bytes to be sent
@@ -231,96 +2106,515 @@ def handle_client(client_socket, client_ip_address, client_port_number, input_ti
 
         # Voids the '-t' flag
         input_time = None
+    else:
+        # Without the '-n' flag, the bytes are sent until the timer stops the stream
+        num_bytes = None
 
-    # Starting time at when the client sends the bytes
-    start_time = time.time()
+    # Sends the parameters of the test to the server before the transfer starts
+    # The server leaves the warm-up of the '-O' flag out of its results as well
+    start_test(client_socket, {"time": input_time, "num": num_bytes, "length": buffer_length, "bitrate": bitrate, "pacing": pacing, "omit": omit})
 
-    # Time of last interval
-    current_time = start_time
+    # Sends the bytes at the target bitrate of the '--bitrate' flag, if any, and shuts down the sending side of the connection to indicate that the transfer is complete
+    send_bytes(client_socket, stream, num_bytes, buffer_length, zerocopy, bitrate, pacing, True)
 
-    # Starting value of sent bytes
-    total_sent_bytes = 0
+    # Defining the response message from the server
+    message_type, result = recv_message(client_socket)
 
-    # Starting value of sent bytes in a interval
-    interval_sent_bytes = 0
-    
-    # Amount of bytes to be sent 
-    bytes = b"0" * 1000
+    # If the client receives the results of the transfer from the server
+    if message_type == MESSAGE_RESULT:
+        # Duration of the transfer in nanoseconds, until the client has received the acknowledgment
+        duration = time.monotonic_ns() - stream.start
+
+        # The amount of sent bytes after the warm-up of the '-O' flag
+        total_sent_bytes = stream.measured_bytes()
 
-    # Transfer the bytes to the server in a loop
-    while(input_time is None and total_sent_bytes < num_bytes) or (input_time is not None and (time.time() - start_time) < input_time):
-        # Sending the bytes to the server
-        sending_bytes = client_socket.send(bytes)
+        # Printing the values in a table format, with the state of the connection at the end if the '--tcp-info' flag is enabled, and the usage of the loop if the '--self-stats' flag is enabled
+        columns, fields = add_self_stats(stream, *(tcp_info_report(stream, False) if stream.socket is not None else ([], {})))
+        print_result("stream", "client", stream.name, 0, duration, total_sent_bytes, input_format, columns, stream.target, **fields)
 
-        # Updates the values of sent bytes
-        total_sent_bytes += sending_bytes
+        # Appends the results of the stream, which are used in the sum of every stream
+        results.append((total_sent_bytes, duration))
 
-        # Updates the values of sent bytes in a interval
-        interval_sent_bytes = interval_sent_bytes + sending_bytes
+        # The server reports the exact amount of bytes it received, including the warm-up, which must match the sent bytes
+        if result["bytes"] != stream.bytes:
+            print_message(f"Warning: {stream.name}: The server received {result['bytes']} of {stream.bytes} bytes")
+
+    # Close the client socket
+    client_socket.close()
 
-        # Calculates values of bytes in intervals 
-        if input_interval_time is not None and (time.time() - current_time >= input_interval_time):
-            # Updates the current time of the last interval
-            current_time = current_time + input_interval_time
+# This function handles the packages in the client with the '-R' flag or the '--bidir' flag, where it will receive from the server, and transfer at the same time for '--bidir'
+def handle_reverse_client(client_socket, send_stream, stream, input_time, input_format, input_num, buffer_length, zerocopy, bitrate, pacing, omit, results):
+    # If the '-n' flag is enabled
+    if input_num is not None:
+        # Defining the bytes to be sent by the server, and by the client for the '--bidir' flag
+        num_bytes = format_num(input_num)
 
-            # Elapsed time of the interval
-            elapsed_time = current_time - start_time
+        # Voids the '-t' flag
+        input_time = None
+    else:
+        # Without the '-n' flag, the bytes are sent until the timer stops the stream
+        num_bytes = None
 
-            # Calculates the rate of the interval in megabites per second
-            interval_rate = (interval_sent_bytes * 8e-6) / input_interval_time 
+    # Sends the parameters of the test to the server, where the server sends with the given buffer size and leaves out the warm-up of the '-O' flag
+    start_test(client_socket, {"time": input_time, "num": num_bytes, "length": buffer_length, "bitrate": bitrate, "pacing": pacing, "omit": omit, "reverse": send_stream is None, "bidir": send_stream is not None})
 
-            # Formating the values of the bytes in either bytes, kilobytes or megabytes
-            interval_sent_bytes_format = format_values(interval_sent_bytes, input_format)
+    # With the '--bidir' flag, the client sends in a thread of its own while it receives, and shuts down its side when it is done
+    # The thread that sends tells the server that the streams start, so the message is not mixed up with the bytes
+    if send_stream is not None:
+        sender = threading.Thread(target=send_bytes, args=(client_socket, send_stream, num_bytes, buffer_length, zerocopy, bitrate, pacing, True))
+        sender.start()
 
-            # Defining the data of the table
-            data = [[f"{client_ip_address}:{client_port_number}", f"{elapsed_time - input_interval_time:.1f} - {elapsed_time:.1f}", f"{interval_sent_bytes_format:.2f} {input_format}", f"{interval_rate:.2f} Mbps"],]
+    # Preallocating the buffer once, so that the receive loop does not allocate new bytes for every call
+    buffer = bytearray(buffer_length)
 
-            # Printing the values in a table format
-            for row in data:
-                print_table(row)
+    # With the '-R' flag, the client shuts down its sending side when the timer stops the stream, which tells the server to stop
+    shut_down = send_stream is not None
 
-            # Reset the values of bytes
-            interval_sent_bytes = 0 
+    # Starting time at when the client receives the bytes, where the server starts to send with the '-R' flag when it is told so
+    stream.start_clock()
+    if send_stream is None:
+        send_message(client_socket, MESSAGE_START, {})
 
-    # Send a message to the server to indicate that the transfer is complete
-    client_socket.sendall("BYE".encode())
+    # Receives the bytes until the server closes its side of the connection, which marks the end of the transfer
+    while True:
+        # Receiving the bytes from the server directly into the buffer
+        received_bytes = client_socket.recv_into(buffer)
+        stream.calls += 1
 
-    # Defining the response message from the server
-    response = client_socket.recv(1024).decode()
+        # The transfer is complete when the server has shut down its sending side
+        if received_bytes == 0:
+            break
 
-    # If the client receives a response that consist of 'ACK: BYE'
-    if response == "ACK: BYE":
+        # Accumulated values of Bytes
+        stream.bytes += received_bytes
 
-        # Ending time at when the client has received the acknowledgment
-        end_time = time.time()
+        # Tells the server to stop once the timer has stopped the stream
+        if not stream.running and not shut_down:
+            client_socket.shutdown(SHUT_WR)
+            shut_down = True
 
-        # Duration of the transfer
-        duration = end_time - start_time
+    # Time and CPU time of the loop, which ends when the server has sent the last byte
+    stream.stop_clock()
 
-        # Formating the values of the bytes in either bytes, kilobytes or megabytes
-        total_sent_bytes_format = format_values(total_sent_bytes, input_format)
+    # Duration of the transfer in nanoseconds, until the server has sent the last byte
+    duration = stream.end_time - stream.start
 
-        # Calculates the rate in megabites per second
-        rate = (total_sent_bytes * 8e-6) / duration
+    # With the '-n' flag, the server stops by itself, and the client closes its side when every byte has arrived
+    if not shut_down:
+        client_socket.shutdown(SHUT_WR)
+
+    # Printing the values of the bytes the client has sent with the '--bidir' flag, which are used in the sum of every stream in that direction
+    # With the '--tcp-info' flag, both rows hold the state of the same connection at the end
+    if send_stream is not None:
+        sender.join()
+        send_duration = send_stream.end_time - send_stream.start
+        columns, fields = add_self_stats(send_stream, *(tcp_info_report(send_stream, False) if send_stream.socket is not None else ([], {})))
+        print_result("stream", "client", send_stream.name, 0, send_duration, send_stream.measured_bytes(), input_format, columns, send_stream.target, **fields)
+        results.append((send_stream.measured_bytes(), send_duration, "TX"))
+
+    # Printing the values of the bytes the client has received in a table format
+    columns, fields = add_self_stats(stream, *(tcp_info_report(stream, False) if stream.socket is not None else ([], {})))
+    print_result("stream", "client", stream.name, 0, duration, stream.measured_bytes(), input_format, columns, stream.target, **fields)
+
+    # Appends the results of the stream, which are used in the sum of every stream
+    results.append((stream.measured_bytes(), duration, "RX") if send_stream is not None else (stream.measured_bytes(), duration))
+
+    # Close the client socket
+    client_socket.close()
+
+# This function sends request/response messages to the server, one at a time, and records the round-trip time of every message
+def handle_rr_client(client_socket, stream, input_time, input_num, message_length, results):
+    # If the '-n' flag is enabled
+    if input_num is not None:
+        # Defining the bytes to be sent
+        num_bytes = format_num(input_num)
+
+        # Voids the '-t' flag
+        input_time = None
+    else:
+        # Without the '-n' flag, the messages are sent until the timer stops the stream
+        num_bytes = None
+
+    # Sends the parameters of the test to the server, where the server sends back every message of the given length
+    start_test(client_socket, {"rr": True, "time": input_time, "num": num_bytes, "length": message_length})
+
+    # Every message is sent at once instead of waiting for more bytes to fill a packet
+    client_socket.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+
+    # The request is allocated once, and the response is received into a preallocated buffer
+    request = memoryview(b"0" * message_length)
+    response = memoryview(bytearray(message_length))
+
+    # Starting time at when the client sends the messages
+    stream.start_clock()
+
+    # Transfer the messages until the timer stops the stream, or every byte of the '-n' flag is sent
+    while stream.running and (num_bytes is None or stream.bytes < num_bytes):
+        # Time at when the request is sent
+        send_time = time.monotonic_ns()
+        client_socket.sendall(request)
+
+        # Receives the whole response
+        received = 0
+        while received < message_length:
+            received_bytes = client_socket.recv_into(response[received:])
+
+            # If the server closes the connection in the middle of a transaction
+            if received_bytes == 0:
+                raise ConnectionError("The server closed the connection in the middle of a transaction")
+            received += received_bytes
+
+        # Records the round-trip time of the transaction
+        stream.histogram.record(time.monotonic_ns() - send_time)
+
+        # Accumulated values of Bytes
+        stream.bytes += message_length
+
+    # Shuts down the sending side of the connection to indicate that the transfer is complete
+    client_socket.shutdown(SHUT_WR)
+
+    # Defining the response message from the server
+    message_type, result = recv_message(client_socket)
+
+    # If the client receives the results of the transfer from the server
+    if message_type == MESSAGE_RESULT:
+        # Duration of the transfer in nanoseconds, until the client has received the acknowledgment
+        duration = time.monotonic_ns() - stream.start
 
-        # Defining the data of the table
-        data = [[f"{client_ip_address}:{client_port_number}", f"0.0 - {duration:.1f}", f"{total_sent_bytes_format:.2f} {input_format}", f"{rate:.2f} Mbps"],]
-        
         # Printing the values in a table format
-        for row in data:
-            print_table(row)
+        print_rr_result("stream", "client", stream.name, 0, duration, stream.histogram)
+
+        # Appends the results of the stream, which are used in the sum of every stream
+        results.append((stream.bytes, duration, stream.histogram))
+
+        # The server reports the exact amount of bytes it received, which must match the sent bytes
+        if result["bytes"] != stream.bytes:
+            print_message(f"Warning: {stream.name}: The server received {result['bytes']} of {stream.bytes} bytes")
 
     # Close the client socket
     client_socket.close()
 
-# This function connects the client to the server
-def start_client(args):
-    # Defining the IP address using the '-I' flag
-    ip_address = args.serverip
+# This function sends a probe over TCP or UDP at a fixed interval while the bulk streams run, and records the round-trip time of every probe
+def handle_probe_client(client_socket, stream, protocol):
+    # Preallocating the buffer that every probe is received into
+    response = bytearray(UDP_HEADER.size)
+
+    # The UDP probes are sent from a socket of their own, while the TCP connection carries the control messages
+    if protocol == "udp":
+        udp_socket = socket(AF_INET, SOCK_DGRAM)
+        udp_socket.bind((client_socket.getsockname()[0], 0))
+        udp_socket.connect(client_socket.getpeername())
+        udp_socket.settimeout(PROBE_TIMEOUT)
+
+        # Sends the parameters of the probe to the server, including the port that the probes are sent from
+        # Waiting until the server is ready, so the first probe is not taken for the datagrams of a UDP transfer
+        start_test(client_socket, {"udp_probe": True, "udp_port": udp_socket.getsockname()[1]})
+    else:
+        # The server sends back every message of a single byte, which is sent at once instead of waiting for more bytes
+        # The probe is tagged, so the server does not report it as a bulk stream
+        start_test(client_socket, {"rr": True, "probe": True, "time": None, "num": None, "length": 1})
+        client_socket.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+
+    # Starting time at when the client sends the probes
+    stream.start_clock()
+
+    # The time in nanoseconds that the next probe is sent at
+    next_time = stream.start
+
+    # Starting value of sent and lost probes
+    sequence = 0
+    lost = 0
+
+    # Sends the probes until the bulk streams are done
+    while stream.running:
+        # Time at when the probe is sent
+        send_time = time.monotonic_ns()
+
+        # A UDP probe holds the sequence number and the time it was sent, and a probe that does not come back in time is lost
+        if protocol == "udp":
+            udp_socket.send(UDP_HEADER.pack(sequence, send_time))
+            try:
+                # Probes that come back after they were counted as lost are skipped
+                while True:
+                    udp_socket.recv_into(response)
+                    if UDP_HEADER.unpack_from(response)[0] == sequence:
+                        break
+                stream.histogram.record(time.monotonic_ns() - send_time)
+            except TimeoutError:
+                lost += 1
+        # A TCP probe is a single byte that the server sends back
+        else:
+            client_socket.sendall(b"0")
+            recv_exact(client_socket, 1)
+            stream.histogram.record(time.monotonic_ns() - send_time)
+
+        # Updates the amount of sent probes
+        sequence += 1
+
+        # Waits until the next probe is due, where a late probe does not make the next ones come faster
+        now = time.monotonic_ns()
+        next_time = max(next_time + int(PROBE_INTERVAL * 1e9), now)
+        if next_time > now:
+            time.sleep((next_time - now) / 1e9)
+
+    # Shuts down the sending side of the connection to indicate that the probe is complete, and waits for the acknowledgement
+    client_socket.shutdown(SHUT_WR)
+    recv_message(client_socket)
+
+    # Close the sockets
+    if protocol == "udp":
+        udp_socket.close()
+    client_socket.close()
 
-    # Defining the port number using the '-p' flag
-    port_number = args.port
+    # Printing the amount of lost probes, if any
+    if lost > 0:
+        print_message(f"Warning: {stream.name}: {lost} of {sequence} probes were lost")
+
+# This function enables UDP GSO on the socket, so a single send is split into several datagrams by the kernel
+def enable_udp_gso(udp_socket, length):
+    # UDP GSO is only available in Linux 4.18 or newer
+    try:
+        udp_socket.setsockopt(SOL_UDP, UDP_SEGMENT, length)
+    except (OSError, NameError):
+        return False
+
+    # The kernel splits every send into datagrams of the given length
+    return True
+
+# This function handles the datagrams in the UDP client, where it will transfer to the server at the target bitrate
+def handle_udp_client(client_socket, stream, input_time, input_format, input_num, buffer_length, bitrate, results):
+    # If the '-n' flag is enabled
+    if input_num is not None:
+        # Defining the bytes to be sent
+        num_bytes = format_num(input_num)
+
+        # Voids the '-t' flag
+        input_time = None
+    else:
+        # Without the '-n' flag, the datagrams are sent until the timer stops the stream
+        num_bytes = None
+
+    # Creates a UDP socket on the same interface as the control connection, connected to the server
+    udp_socket = socket(AF_INET, SOCK_DGRAM)
+    udp_socket.bind((client_socket.getsockname()[0], 0))
+    server_address = client_socket.getpeername()
+    udp_socket.connect(server_address)
+
+    # Gets the client's IP address and UDP port number, which is the ID of the stream
+    client_ip_address, client_port_number = udp_socket.getsockname()
+    stream.name = f"{client_ip_address}:{client_port_number}"
+
+    # Sends the parameters of the test to the server, including the port that the datagrams are sent from
+    start_test(client_socket, {"udp": True, "udp_port": client_port_number, "time": input_time, "num": num_bytes, "length": buffer_length, "bitrate": bitrate})
+
+    # Time in nanoseconds between two datagrams at the target bitrate
+    packet_time = int(buffer_length * 8 * 1e9 / bitrate)
+
+    # Amount of datagrams sent in every batch, so the client only checks the time about once per millisecond
+    batch = max(1, min(int(UDP_BATCH_TIME * 1e9) // max(packet_time, 1), UDP_MAX_SEGMENTS, 65000 // buffer_length))
+
+    # If more than one datagram is sent in a batch, the kernel splits a single send when UDP GSO is available
+    gso = batch > 1 and enable_udp_gso(udp_socket, buffer_length)
+
+    # Preallocating the buffer of a whole batch, where every datagram gets its header written in place
+    buffer = bytearray(b"0" * (buffer_length * batch))
+    payload = memoryview(buffer)
+
+    # Starting time at when the client sends the datagrams
+    stream.start_clock()
+
+    # The time in nanoseconds that the next batch is sent at
+    next_time = stream.start
+
+    # Starting value of sent datagrams
+    sequence = 0
+
+    # Transfer the datagrams to the server until the timer stops the stream, or every byte of the '-n' flag is sent
+    while stream.running and (num_bytes is None or stream.bytes < num_bytes):
+        # Amount of datagrams in this batch, where the last batch of the '-n' flag only holds the remaining bytes
+        count = batch
+        if num_bytes is not None:
+            count = min(batch, -(-(num_bytes - stream.bytes) // buffer_length))
+
+        # Every datagram holds its sequence number and the time it was sent, which the jitter of the server is measured from
+        # A refused send means that nothing receives the datagrams on the port of the server
+        try:
+            # With UDP GSO, the kernel sends every datagram of the batch from a single call, so they share the time of the call
+            if gso:
+                send_time = time.monotonic_ns()
+                for i in range(count):
+                    UDP_HEADER.pack_into(buffer, i * buffer_length, sequence + i, send_time)
+                udp_socket.send(payload[:count * buffer_length])
+
+            # Otherwise every datagram is sent in a call of its own, and gets the time of its own call
+            else:
+                for i in range(count):
+                    UDP_HEADER.pack_into(buffer, 0, sequence + i, time.monotonic_ns())
+                    udp_socket.send(payload[:buffer_length])
+        except ConnectionRefusedError:
+            udp_socket.close()
+            client_socket.close()
+            raise ConnectionError(f"{stream.name}: The server does not receive UDP datagrams on port {server_address[1]}")
+
+        # Updates the values of sent datagrams and bytes
+        sequence += count
+        stream.bytes += count * buffer_length
+
+        # Waits until the next batch is due at the target bitrate
+        next_time += count * packet_time
+        sleep_time = next_time - time.monotonic_ns()
+        if sleep_time > 0:
+            time.sleep(sleep_time / 1e9)
+
+    # Duration of the transfer in nanoseconds
+    duration = time.monotonic_ns() - stream.start
+
+    # The amount of sent bytes
+    total_sent_bytes = stream.bytes
+
+    # Tells the server how many datagrams were sent, and waits for the results
+    send_message(client_socket, MESSAGE_DONE, {"packets": sequence, "bytes": total_sent_bytes})
+    message_type, result = recv_message(client_socket)
+
+    # If the client receives the results of the transfer from the server
+    # The server only sends the jitter and the loss with the results, so the interval rows of the client hold the sent bytes alone
+    if message_type == MESSAGE_RESULT:
+        # Printing the values in a table format, with the jitter and the loss measured by the server
+        print_result("stream", "client", stream.name, 0, duration, total_sent_bytes, input_format, udp_columns(result), packets = result["packets"], sent = result["sent"], lost = result["lost"], out_of_order = result["out_of_order"], jitter = result["jitter"])
+
+        # Appends the results of the stream, which are used in the sum of every stream
+        results.append((total_sent_bytes, duration))
+
+    # Close the sockets
+    udp_socket.close()
+    client_socket.close()
+
+# This function stops the streams when the duration has passed and prints the interval reports, so the sending loops never read the clock
+def run_client_timer(streams, input_time, input_interval_time, input_format, finished, probe = None, clock = None, shared_sums = None, process = None, omit = 0):
+    # Time in nanoseconds at when the timer starts, which is the start of every stream, so every stream stops and reports at the same time
+    start_time = clock.wait() if clock is not None else time.monotonic_ns()
+
+    # With the '-O' flag, the streams send during the warm-up, and the results and the intervals start when it ends
+    if omit:
+        start_time += int(omit * 1e9)
+        if finished.wait(max(0, start_time - time.monotonic_ns()) / 1e9):
+            return
+        for stream in streams:
+            stream.omit(start_time)
+        if probe is not None:
+            probe.omit(start_time)
+
+    # The amount of interval reports so far
+    tick = 0
+
+    # Time at when the streams are stopped, if the '-t' flag is in use
+    stop_time = start_time + int(input_time * 1e9) if input_time is not None else None
+
+    # Time of the next interval report, if the '-i' flag is enabled
+    report_time = start_time + int(input_interval_time * 1e9) if input_interval_time is not None else None
+
+    # Continues until the streams are stopped, or every stream is finished
+    while stop_time is not None or report_time is not None:
+        # The timer wakes up at the next stop or report, whichever comes first
+        wake_time = min(t for t in (stop_time, report_time) if t is not None)
+
+        # Waits until then, or returns if every stream has finished before that
+        if finished.wait(max(0, wake_time - time.monotonic_ns()) / 1e9):
+            return
+
+        # Time after waking up
+        now = time.monotonic_ns()
+
+        # Prints the interval report if it is due, where request/response streams report the round-trip times
+        if report_time is not None and now >= report_time:
+            tick += 1
+            if isinstance(streams[0], RttStream):
+                print_rr_intervals(streams, "client")
+            # With the '-w' flag, the rows of this process are written before its bytes are shared, so the sum of the main process follows them
+            elif shared_sums is not None:
+                print_intervals(streams, input_format, "client", print_sums = False)
+                sys.stdout.flush()
+                shared_sums.publish(process, streams, tick)
+            else:
+                print_intervals(streams, input_format, "client", probe = probe)
+            report_time += int(input_interval_time * 1e9)
+
+        # Stops every stream when the duration has passed
+        if stop_time is not None and now >= stop_time:
+            for stream in streams:
+                stream.running = False
+            return
+
+# This function prints the sum of the streams of every process of the '-w' flag at every interval, from the bytes that the processes share
+def report_process_sums(clock, shared_sums, input_interval_time, input_format, finished, columns, target, omit = 0):
+    # The start of every stream, which the intervals of every process are aligned to, and which the warm-up of the '-O' flag comes before
+    start_time = clock.wait() + int(omit * 1e9)
+    interval = int(input_interval_time * 1e9)
+
+    # The bytes in every direction at the last report
+    reported_bytes = [0] * len(shared_sums.directions)
+
+    # Continues until every process is done
+    tick = 0
+    while True:
+        # Waits until the next report is due, or returns if every process is done before that
+        tick += 1
+        if finished.wait(max(0, start_time + tick * interval - time.monotonic_ns()) / 1e9):
+            return
+
+        # Waits until every process that is still running has printed its rows of the interval, for at most half an interval
+        deadline = start_time + tick * interval + interval // 2
+        while any(0 <= process_tick < tick for process_tick in shared_sums.ticks) and time.monotonic_ns() < deadline:
+            time.sleep(SUM_POLL_TIME)
+
+        # When every process is done, the transfer has ended before this interval
+        if all(process_tick == SUM_DONE for process_tick in shared_sums.ticks):
+            return
+
+        # Printing the sum of every direction, where the bytes of a process that is late are added to the next interval
+        for index, direction in enumerate(shared_sums.directions):
+            total_bytes = shared_sums.total(index)
+            print_result("interval_sum", "client", f"[SUM] {direction}" if direction else "[SUM]", (tick - 1) * interval, tick * interval, total_bytes - reported_bytes[index], input_format, columns, target)
+            reported_bytes[index] = total_bytes
+        sys.stdout.flush()
+
+# This function runs the handler of a stream, and releases the other streams from the start if the handler fails
+# An error of the connection, such as a test that the server has turned away, is added to the given list, so the client can exit with it
+def run_handler(handler, clock, errors, *handler_args):
+    try:
+        handler(*handler_args)
+    except OSError as error:
+        clock.barrier.abort()
+        errors.append(str(error))
+    except BaseException:
+        clock.barrier.abort()
+        raise
+
+# This function connects the given amount of streams to the server and returns their sockets
+def connect_streams(ip_address, port_number, streams):
+    # Defining the list of the sockets of every stream
+    client_sockets = []
 
+    # Iterate for each parallel connection
+    for i in range(streams):
+        # Create a TCP socket
+        client_socket = socket(AF_INET, SOCK_STREAM)
+
+        # Connect to the server
+        client_socket.connect((ip_address, port_number))
+
+        # Prints out a confirmation that the client is connected to the server
+        print_message(f"Client connected with server {ip_address}:{port_number}")
+
+        # Appends the socket
+        client_sockets.append(client_socket)
+
+    # Returns the sockets of every stream
+    return client_sockets
+
+# This function runs every stream in its own thread and appends their results to the given list
+# Returns the errors of the streams that have failed
+def run_streams(args, client_sockets, results, probe = None, probe_socket = None, clock = None, shared_sums = None, process = None):
     # Defining the specified duration using the '-t' flag
     input_time = args.time
 
@@ -333,35 +2627,74 @@ def start_client(args):
     # Defining the amount of bytes to be sent using the '-n' flag
     input_num = args.num
 
-    # Defining the amount of parallel connections using the '-P' flag
-    input_parallel = args.parallel
-        
-    # Defining the headers of the table 
-    headers = ["ID", "Interval", "Transfer", "Bandwidth"]
+    # Defining the size of the send buffer using the '-l' flag
+    buffer_length = format_num(args.length)
+
+    # Defining if the payload is sent with sendfile() using the '-Z' flag
+    zerocopy = args.zerocopy
+
+    # Defining the target bitrate of every stream using the '--bitrate' flag, and if the kernel paces a TCP stream using the '--pacing' flag
+    bitrate = format_bitrate(args.bitrate) if args.bitrate is not None else None
+    pacing = args.pacing
 
     # Defining the list to be used when we append parallel connections
     connection_list = []
 
-    # Iterate for each parallel connection
-    for i in range(input_parallel):
-        # Create a TCP socket
-        client_socket = socket(AF_INET, SOCK_STREAM)
+    # Defining the list of the state of every stream, which the timer reads and stops
+    streams = []
 
-        # Connect to the server
-        client_socket.connect((ip_address, port_number))
+    # Defining the list of the errors of the streams that have failed
+    errors = []
 
-        # Prints out a confirmation that the client is connected to the server
-        print(f"Client connected with server {ip_address}:{port_number}")
-    
+    # Every stream, and the timer, waits for the others before the transfer starts, unless the processes of the '-w' flag share a start
+    # With the '--bidir' flag, both directions of a connection start at the same time
+    if clock is None:
+        clock = StartClock(threading.Barrier(len(client_sockets) * (2 if args.bidir else 1) + 1))
+
+    # Iterate for each connected stream
+    for client_socket in client_sockets:
         # Gets the client's IP address and port number
         client_ip_address, client_port_number = client_socket.getsockname()
 
-        # If this is the last connection, print the headers of the table
-        if i == input_parallel - 1:
-            print_table(headers)
-
-        # Creates a new thread to handle the connection
-        thread = threading.Thread(target=handle_client, args=(client_socket, client_ip_address, client_port_number, input_time, input_format, input_interval_time, input_num))
+        # The state of the stream, which records the round-trip times if the '--rr' flag is enabled, and holds the received bytes if the '-R' flag or the '--bidir' flag is enabled
+        if args.rr:
+            stream = RttStream(f"{client_ip_address}:{client_port_number}")
+        elif args.reverse or args.bidir:
+            stream = Stream(f"{client_ip_address}:{client_port_number}", "RX")
+        else:
+            stream = Stream(f"{client_ip_address}:{client_port_number}")
+        stream.clock = clock
+        streams.append(stream)
+
+        # The state of the bytes that the client sends at the same time with the '--bidir' flag
+        send_stream = Stream(f"{client_ip_address}:{client_port_number}", "TX") if args.bidir else None
+        if send_stream is not None:
+            send_stream.clock = clock
+            streams.append(send_stream)
+
+        # The rate of a TCP stream is reported as a share of the target bitrate
+        if not args.udp:
+            stream.target = bitrate
+            if send_stream is not None:
+                send_stream.target = bitrate
+
+        # With the '--tcp-info' flag, the interval reports sample the connection of the stream
+        if args.tcp_info:
+            stream.socket = client_socket
+            if send_stream is not None:
+                send_stream.socket = client_socket
+
+        # Creates a new thread to handle the connection, which sends UDP datagrams if the '-u' flag is enabled, or request/response messages if the '--rr' flag is enabled
+        # With the '-R' flag or the '--bidir' flag, the thread receives from the server
+        # If the handler fails, the other streams are released from the start instead of waiting for it
+        if args.reverse or args.bidir:
+            thread = threading.Thread(target=run_handler, args=(handle_reverse_client, clock, errors, client_socket, send_stream, stream, input_time, input_format, input_num, buffer_length, zerocopy, bitrate, pacing, args.omit, results))
+        elif args.udp:
+            thread = threading.Thread(target=run_handler, args=(handle_udp_client, clock, errors, client_socket, stream, input_time, input_format, input_num, buffer_length, bitrate, results))
+        elif args.rr:
+            thread = threading.Thread(target=run_handler, args=(handle_rr_client, clock, errors, client_socket, stream, input_time, input_num, format_num(args.rr), results))
+        else:
+            thread = threading.Thread(target=run_handler, args=(handle_client, clock, errors, client_socket, stream, input_time, input_format, input_num, buffer_length, zerocopy, bitrate, pacing, args.omit, results))
         
         # Appends the thread
         connection_list.append(thread)
@@ -369,14 +2702,266 @@ def start_client(args):
         # Initiates the thread
         thread.start()
 
+    # If the '--probe' flag is enabled, the probe runs in a thread of its own next to the streams
+    if probe is not None:
+        probe_thread = threading.Thread(target=run_handler, args=(handle_probe_client, clock, errors, probe_socket, probe, args.probe))
+        probe_thread.start()
+
+    # Set when every stream has finished, which stops the timer
+    finished = threading.Event()
+
+    # A single timer stops every stream and prints the interval reports, where the '-n' flag voids the '-t' flag
+    # The timer starts with the streams, so every interval of every stream starts and ends at the same time, and ends the warm-up of the '-O' flag
+    timer = threading.Thread(target=run_client_timer, args=(streams, input_time if input_num is None else None, input_interval_time, input_format, finished, probe, clock, shared_sums, process, args.omit))
+    timer.start()
+
     # Awaiting for all the threads to finish
     for j in connection_list:
         j.join()
 
+    # The probe is stopped when every stream has finished
+    if probe is not None:
+        probe.running = False
+        probe_thread.join()
+
+    # Stops the timer
+    finished.set()
+    timer.join()
+
+    # Returns the errors of the streams
+    return errors
+
+# This function runs a share of the streams in a worker process and sends their results back to the main process
+def run_stream_process(args, test, streams, cpu, start_barrier, result_queue, clock, shared_sums, process):
+    # The output format, the '--self-stats' flag and the ID of the test of the main process, which a worker does not share under the spawn or forkserver start methods
+    apply_settings(args, test)
+
+    # Defining the list of the results and the errors of the streams in this process
+    results = []
+    errors = []
+
+    try:
+        # If the '-A' flag is enabled, the process only runs on the given CPU core
+        if cpu is not None:
+            os.sched_setaffinity(0, {cpu})
+
+        # Connects the streams of this process to the server
+        try:
+            client_sockets = connect_streams(args.serverip, args.port, streams)
+        except OSError as error:
+            # Releases the other processes instead of letting them wait for this one
+            start_barrier.abort()
+            print_message(f"Error: {error}")
+            return
+
+        # Waiting until every process has connected its streams, so they start at the same time
+        try:
+            start_barrier.wait()
+        except threading.BrokenBarrierError:
+            return
+
+        # Runs the streams of this process, which start at the same time as the streams of every other process
+        errors = run_streams(args, client_sockets, results, clock = clock, shared_sums = shared_sums, process = process)
+    finally:
+        # The main process no longer waits for the interval reports of this process
+        if shared_sums is not None:
+            shared_sums.finish(process)
+
+        # Sends the results and the errors back to the main process, also when a stream has failed
+        result_queue.put((results, errors))
+
+# This function prints the sum of the results of every stream
+def print_sum(results, input_format, probe = None, name = "[SUM]", bitrate = None, tcp_info = False):
+    # The total amount of bytes of every stream
+    total_sent_bytes = sum(sent_bytes for sent_bytes, duration in results)
+
+    # The transfer is complete when the last stream is complete
+    duration = max(duration for sent_bytes, duration in results)
+
+    # Printing the sum in a table format, with the round-trip times of the whole transfer if the '--probe' flag is enabled
+    # With the '--bitrate' flag, the target of the sum is the target of every stream together
+    # With the '--tcp-info' flag and the '--self-stats' flag, the columns of the connections are left empty, since every connection has printed its own state
+    columns = (tcp_info_sum_columns() if tcp_info else []) + (["-"] * len(SELF_STATS_HEADERS) if self_stats else []) + (probe_columns(probe.histogram) if probe is not None else [])
+    print_result("sum", "client", name, 0, duration, total_sent_bytes, input_format, columns, bitrate * len(results) if bitrate else None)
+
+    # A record of the round-trip times follows the record of the sum
+    if probe is not None and output_mode != "table":
+        print_rr_result("stream", "client", probe.name, 0, duration, probe.histogram)
+
+# This function prints the round-trip times of every request/response stream together
+def print_rr_sum(results):
+    # The round-trip times of every stream
+    histogram = Histogram()
+    for sent_bytes, duration, stream_histogram in results:
+        histogram.add(stream_histogram)
+
+    # The transfer is complete when the last stream is complete
+    duration = max(duration for sent_bytes, duration, stream_histogram in results)
+
+    # Printing the sum in a table format
+    print_rr_result("sum", "client", "[SUM]", 0, duration, histogram)
+
+# This function connects the client to the server
+def start_client(args):
+    # Defining the IP address using the '-I' flag
+    ip_address = args.serverip
+
+    # Defining the port number using the '-p' flag
+    port_number = args.port
+
+    # Defining the amount of parallel connections using the '-P' flag
+    input_parallel = args.parallel
+
+    # Defining the amount of processes using the '-w' flag
+    input_processes = args.processes
+        
+    # Defining the headers of the table, where UDP also shows the jitter and the loss, and the '--rr' flag shows the round-trip times instead
+    headers = ["ID", "Interval", "Transfer", "Bandwidth"]
+    if args.udp:
+        headers += ["Jitter", "Lost/Total"]
+    elif args.rr:
+        headers = ["ID", "Interval", "Transactions", "Rate"] + [f"p{percentile:g}" for percentile in RR_PERCENTILES]
+    # With the '--bitrate' flag, a TCP stream also shows its rate as a share of the target bitrate
+    tcp_bitrate = format_bitrate(args.bitrate) if args.bitrate is not None and not args.udp else None
+    if tcp_bitrate:
+        headers += ["Target"]
+    if args.tcp_info:
+        headers += TCP_INFO_HEADERS
+    if args.self_stats:
+        headers += SELF_STATS_HEADERS
+    if args.probe:
+        headers += [f"RTT p{percentile:g}" for percentile in PROBE_PERCENTILES]
+
+    # The state of the probe of the '--probe' flag
+    probe = RttStream("[PROBE]") if args.probe else None
+
+    # The usage of the client from the start, if the '--self-stats' flag is enabled
+    start_usage = read_usage() if args.self_stats else None
+
+    # Defining the list of the results and the errors of every stream
+    results = []
+    errors = []
+
+    # Every connection of this client, in every process of the '-w' flag, tells the server that it belongs to the same test
+    apply_settings(args, os.urandom(8).hex())
+
+    # If every stream runs in this process
+    if input_processes == 1:
+        # Connects every stream to the server, and the probe on a connection of its own
+        client_sockets = connect_streams(ip_address, port_number, input_parallel)
+        probe_socket = connect_streams(ip_address, port_number, 1)[0] if probe is not None else None
+
+        # Print the headers of the table when every stream is connected
+        print_headers(headers)
+
+        # Runs every stream in its own thread
+        errors = run_streams(args, client_sockets, results, probe, probe_socket)
+
+    # If the streams are spread across several processes
+    else:
+        # Every process and this process waits for each other before the transfer starts
+        start_barrier = multiprocessing.Barrier(input_processes + 1)
+
+        # The processes sends their results back through this queue
+        result_queue = multiprocessing.Queue()
+
+        # With the '-i' flag, the processes share the bytes of their streams at every interval, and this process prints the sum of every process
+        # The sum of the round-trip times of the '--rr' flag cannot be added up from counters, so every process prints its own
+        shared_sums = None
+        if args.interval is not None and not args.rr:
+            shared_sums = SharedSums(input_processes, ["TX", "RX"] if args.bidir else ["RX"] if args.reverse else [None])
+
+        # Every stream and the timer of every process, and the sum of this process, start at the same time
+        clock = StartClock(multiprocessing.Barrier(input_parallel * (2 if args.bidir else 1) + input_processes + (1 if shared_sums is not None else 0)))
+
+        # If the '-A' flag is enabled, the processes are spread across the available CPU cores
+        cores = sorted(os.sched_getaffinity(0)) if args.affinity else None
+
+        # Anything printed so far must be written before the processes copy the output buffer
+        sys.stdout.flush()
+
+        # Defining the list of the processes
+        process_list = []
+
+        # Iterate for each process
+        for i in range(input_processes):
+            # The streams are spread as evenly as possible across the processes
+            streams = input_parallel // input_processes + (1 if i < input_parallel % input_processes else 0)
+
+            # The CPU core of the process if the '-A' flag is enabled
+            cpu = cores[i % len(cores)] if cores else None
+
+            # Creates a new process to handle the streams
+            process = multiprocessing.Process(target=run_stream_process, args=(args, test_id, streams, cpu, start_barrier, result_queue, clock, shared_sums, i))
+
+            # Appends the process
+            process_list.append(process)
+
+            # Initiates the process
+            process.start()
+
+        # Waiting until every process has connected its streams
+        try:
+            start_barrier.wait()
+        except threading.BrokenBarrierError:
+            sys.exit("Error: Not every parallel connection could connect to the server")
+
+        # Print the headers of the table when every stream is connected
+        print_headers(headers)
+        sys.stdout.flush()
+
+        # Prints the sum of every process at every interval, where the connections have printed their state in their own rows
+        if shared_sums is not None:
+            sum_columns = (tcp_info_sum_columns() if args.tcp_info else []) + (["-"] * len(SELF_STATS_HEADERS) if args.self_stats else [])
+            finished = threading.Event()
+            reporter = threading.Thread(target=report_process_sums, args=(clock, shared_sums, args.interval, args.format, finished, sum_columns, tcp_bitrate * input_parallel if tcp_bitrate else None, args.omit))
+            reporter.start()
+
+        # Collects the results and the errors of every process
+        for process in process_list:
+            process_results, process_errors = result_queue.get()
+            results.extend(process_results)
+            errors.extend(process_errors)
+
+        # Awaiting for all the processes to finish
+        for process in process_list:
+            process.join()
+
+        # Stops the sum of every process
+        if shared_sums is not None:
+            finished.set()
+            reporter.join()
+
+    # If there are several parallel connections and at least one of them is complete, print the sum of them
+    # The sum also holds the round-trip times of the '--probe' flag, so it is printed for a single connection as well
+    if (input_parallel > 1 or probe is not None) and results:
+        if args.rr:
+            print_rr_sum(results)
+        # With the '--bidir' flag, every direction has a sum of its own
+        elif args.bidir:
+            for direction in ("TX", "RX"):
+                print_sum([(total_bytes, duration) for total_bytes, duration, stream_direction in results if stream_direction == direction], args.format, probe if direction == "RX" else None, f"[SUM] {direction}", tcp_bitrate, args.tcp_info)
+        else:
+            print_sum(results, args.format, probe, bitrate = tcp_bitrate, tcp_info = args.tcp_info)
+
+    # Printing the usage of the client and of its processes, which flags a run where simpleperf was CPU-bound
+    if start_usage is not None:
+        print_self_stats("client", start_usage, input_processes)
+
+    # If a stream has failed, the client exits with the error, where every stream of a test that is turned away has the same one
+    if errors:
+        sys.exit("Error: " + "; ".join(dict.fromkeys(errors)))
+
 # This is the main entry point of the program
 if __name__ == '__main__':
     # Parses the command line arguments using the argparse module
     args = parse_args()
+
+    # The '--self-stats' flag adds the usage of simpleperf to the results of every stream
+    # The '--json' and '--csv' flags prints records instead of a table, where the CSV output starts with the names of the columns
+    apply_settings(args)
+    if args.csv:
+        print_csv(CSV_FIELDS)
     
     # If the server flag is present, start the server
     if args.server:
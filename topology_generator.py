@@ -0,0 +1,179 @@
+'''
+
+DATA 2410: Mininet script that generates a network of routers and hosts from parameters, such as:
+
+chain       h - R1 --- R2 --- R3 --- ... --- RN - h        every router has a subnet of hosts
+
+tree        R1                                              every router has a subnet of hosts, and
+           /  \\                                             every router has up to FANOUT children
+         R2    R3
+        /  \\
+      R4    R5 ...
+
+dumbbell    h \\                       / h                   only the two routers at the ends have hosts,
+            h - R1 --- R2 --- ... --- RN - h                so every flow crosses the same links
+            h /                       \\ h
+
+Every subnet of hosts gets a /24 of 10.0.0.0/9, and every link between two routers gets a /30 of
+10.128.0.0/9. The static routes of every router follow the shortest path through the routers, and are
+declared on the nodes, so portfolio_topology.configure_network() adds them with a single ip -batch.
+
+    sudo python3 topology_generator.py --shape tree --routers 7 --hosts 3 --bw 20 --delay 5ms
+
+'''
+
+import argparse
+import ipaddress
+from collections import deque
+
+from mininet.topo import Topo
+from mininet.log import setLogLevel, info
+from mininet.cli import CLI
+
+from portfolio_topology import LinuxRouter, start_network, stop_network
+
+
+# The address space of the subnets of hosts and of the links between two routers
+LAN_POOL = ipaddress.ip_network( '10.0.0.0/9' )
+LINK_POOL = ipaddress.ip_network( '10.128.0.0/9' )
+
+
+class GeneratedNetwork( Topo ):
+    """A chain, tree or dumbbell of routers, with a subnet of hosts behind the routers.
+    The links between two routers are shaped with bw, delay and max_queue_size, as the links of PortfolioNetwork2410."""
+
+    def build( self, shape='chain', routers=4, hosts=1, fanout=2, bw=None, delay=None, max_queue_size=None, **_opts ):
+        # The links between two routers, as pairs of router indexes
+        if shape == 'tree':
+            edges = [ ( ( i - 1 ) // fanout, i ) for i in range( 1, routers ) ]
+        else:
+            edges = [ ( i, i + 1 ) for i in range( routers - 1 ) ]
+
+        # The routers that have a subnet of hosts
+        if shape == 'dumbbell':
+            lans = { 0, routers - 1 }
+        else:
+            lans = set( range( routers ) )
+
+        # Every subnet and every interface, where the interfaces of a router are (name, address, subnet, neighbor)
+        lan_subnets = LAN_POOL.subnets( new_prefix=24 )
+        link_subnets = LINK_POOL.subnets( new_prefix=30 )
+        intfs = [ [] for i in range( routers ) ]
+
+        # The subnet of hosts of a router is its first interface, so the address of the router is on that subnet
+        lan_addresses = {}
+        for i in sorted( lans ):
+            subnet = next( lan_subnets )
+            address = subnet.network_address + 1
+            intfs[ i ].append( ( 'r%d-eth0' % ( i + 1 ), address, subnet, None ) )
+            lan_addresses[ i ] = ( subnet, address )
+
+        # Every link between two routers gets the first and the second address of its subnet
+        for a, b in edges:
+            subnet = next( link_subnets )
+            intfs[ a ].append( ( 'r%d-eth%d' % ( a + 1, len( intfs[ a ] ) ), subnet.network_address + 1, subnet, b ) )
+            intfs[ b ].append( ( 'r%d-eth%d' % ( b + 1, len( intfs[ b ] ) ), subnet.network_address + 2, subnet, a ) )
+
+        # The routers, with the routes through the routers and the offloads of their links to other routers turned off
+        names = []
+        for i in range( routers ):
+            name, address, subnet, neighbor = intfs[ i ][ 0 ]
+            names.append( self.addNode( 'r%d' % ( i + 1 ), cls=LinuxRouter, ip='%s/%d' % ( address, subnet.prefixlen ),
+                                        routes=self.routes( i, intfs ),
+                                        offloads=[ intf[ 0 ] for intf in intfs[ i ] if intf[ 3 ] is not None ] ) )
+
+        # The hosts of every subnet, behind a switch, numbered h1, h2, ... in the order of the routers
+        # The subnets are linked before the links between two routers, so the subnet is the default interface of its router
+        count = 0
+        for i in sorted( lans ):
+            subnet, gateway = lan_addresses[ i ]
+            switch = self.addSwitch( 's%d' % ( i + 1 ) )
+            self.addLink( switch, names[ i ], intfName2='r%d-eth0' % ( i + 1 ), params2={ 'ip': '%s/%d' % ( gateway, subnet.prefixlen ) } )
+            for j in range( hosts ):
+                count += 1
+                host = self.addHost( 'h%d' % count, ip='%s/%d' % ( gateway + 1 + j, subnet.prefixlen ),
+                                     defaultRoute='via %s' % gateway, offloads=[ 'h%d-eth0' % count ] )
+                self.addLink( host, switch )
+
+        # The links between two routers, shaped as the links of the portfolio
+        shaping = { key: value for key, value in ( ( 'bw', bw ), ( 'delay', delay ), ( 'max_queue_size', max_queue_size ) ) if value is not None }
+        if shaping:
+            shaping[ 'use_htb' ] = True
+        for a, b in edges:
+            intf_a = next( intf for intf in intfs[ a ] if intf[ 3 ] == b )
+            intf_b = next( intf for intf in intfs[ b ] if intf[ 3 ] == a )
+            self.addLink( names[ a ], names[ b ], intfName1=intf_a[ 0 ], intfName2=intf_b[ 0 ],
+                          params1={ 'ip': '%s/%d' % ( intf_a[ 1 ], intf_a[ 2 ].prefixlen ) },
+                          params2={ 'ip': '%s/%d' % ( intf_b[ 1 ], intf_b[ 2 ].prefixlen ) }, **shaping )
+
+    @staticmethod
+    def routes( source, intfs ):
+        """Returns the routes of a router to every subnet that it is not attached to,
+        as ( subnet, next hop, interface ) through the first router on the shortest path."""
+
+        # The first hop of the shortest path to every router, found with a breadth-first search
+        first_hops = { source: None }
+        queue = deque( [ source ] )
+        while queue:
+            router = queue.popleft()
+            for name, address, subnet, neighbor in intfs[ router ]:
+                if neighbor is not None and neighbor not in first_hops:
+                    first_hops[ neighbor ] = neighbor if router == source else first_hops[ router ]
+                    queue.append( neighbor )
+
+        # The interface of this router and the address of the first router on every link to a neighbor
+        attached = { intf[ 2 ] for intf in intfs[ source ] }
+        via = {}
+        for name, address, subnet, neighbor in intfs[ source ]:
+            if neighbor is not None:
+                via[ neighbor ] = ( next( intf[ 1 ] for intf in intfs[ neighbor ] if intf[ 3 ] == source ), name )
+
+        # Every subnet of every other router goes through the first hop towards that router
+        routes = []
+        for router, first_hop in first_hops.items():
+            if first_hop is None:
+                continue
+            for name, address, subnet, neighbor in intfs[ router ]:
+                if subnet not in attached:
+                    attached.add( subnet )
+                    routes.append( ( str( subnet ), str( via[ first_hop ][ 0 ] ), via[ first_hop ][ 1 ] ) )
+        return routes
+
+
+def parse_args():
+    """Returns the parameters of the network from the command line."""
+
+    parser = argparse.ArgumentParser( description='Generates a Mininet network of routers and hosts' )
+    parser.add_argument( '--shape', choices=[ 'chain', 'tree', 'dumbbell' ], default='chain', help="Shape of the routers" )
+    parser.add_argument( '--routers', type=int, default=4, help="Number of routers" )
+    parser.add_argument( '--hosts', type=int, default=1, help="Number of hosts in every subnet of hosts" )
+    parser.add_argument( '--fanout', type=int, default=2, help="Number of children of every router in a tree" )
+    parser.add_argument( '--bw', type=float, help="Bandwidth in Mbps of the links between two routers" )
+    parser.add_argument( '--delay', type=str, help="Delay of the links between two routers, e.g. 10ms" )
+    parser.add_argument( '--queue', type=int, help="Maximum queue size in packets of the links between two routers" )
+    parser.add_argument( '--ping', action='store_true', help="Pings between every pair of hosts before the CLI starts" )
+    args = parser.parse_args()
+
+    if args.routers < 1 or args.hosts < 1 or args.fanout < 1 or ( args.shape == 'dumbbell' and args.routers < 2 ):
+        parser.error( "a network needs at least one router, one host and a fanout of one, and a dumbbell needs two routers" )
+    if args.hosts > 253:
+        parser.error( "a subnet of hosts holds at most 253 hosts" )
+    return args
+
+
+def generate_topology( args ):
+    """Returns the topology of the given parameters."""
+
+    return GeneratedNetwork( shape=args.shape, routers=args.routers, hosts=args.hosts, fanout=args.fanout,
+                             bw=args.bw, delay=args.delay, max_queue_size=args.queue )
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    setLogLevel( 'info' )
+    net, timings = start_network( generate_topology( args ) )
+    info( '*** %d routers and %d hosts\n' % ( args.routers, len( net.hosts ) - args.routers ) )
+    if args.ping:
+        net.pingAll()
+    CLI( net )
+    stop_network( net )